@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from cart.totals import rebuild_totals
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized item_count/total_amount of every cart from its items.'
+
+    def handle(self, *args, **options):
+        fixed = rebuild_totals()
+        self.stdout.write(self.style.SUCCESS(f'Cart totals rebuilt ({fixed} carts corrected).'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:04
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def backfill_totals(apps, schema_editor):
+    Cart = apps.get_model('cart', 'Cart')
+    CartItem = apps.get_model('cart', 'CartItem')
+    totals = (
+        CartItem.objects.values('cart_id')
+        .annotate(count=Sum('quantity'), amount=Sum(F('quantity') * F('price'), output_field=models.DecimalField(max_digits=14, decimal_places=2)))
+    )
+    for row in totals:
+        Cart.objects.filter(pk=row['cart_id']).update(item_count=row['count'] or 0, total_amount=row['amount'] or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -8,6 +8,9 @@ class Cart(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Dipelihara oleh signal CartItem (cart/totals.py), dibetulkan dengan command rebuild_cart_totals
+    item_count = models.PositiveIntegerField(default=0)
+    total_amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
 
     def __str__(self):
         return f"Keranjang {self.user.username}"
@@ -15,15 +18,12 @@ class Cart(models.Model):
     @property
     def total_items(self):
         """Jumlah total item (bukan jenis produk)."""
-        return self.items.aggregate(total=models.Sum('quantity'))['total'] or 0
+        return self.item_count
 
     @property
     def total_price(self):
-        """Hitung total harga dari semua item di keranjang."""
-        total = Decimal('0.00')
-        for item in self.items.all():
-            total += item.quantity * item.price
-        return total
+        """Total harga semua item di keranjang."""
+        return Decimal(self.total_amount)
 
 
 class CartItem(models.Model):
@@ -38,6 +38,12 @@ class CartItem(models.Model):
     def __str__(self):
         return f"{self.product.product_name} x {self.quantity}"
 
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # Nilai lama untuk selisih total harus mengikuti data yang baru dimuat
+        from cart.signals import remember_item_totals
+        remember_item_totals(CartItem, self)
+
     def subtotal(self):
         """Hitung subtotal per item."""
         return self.quantity * self.price
@@ -0,0 +1,175 @@
+"""
+Mutasi keranjang yang dipakai view web dan API Flutter.
+
+add_item menambah satu unit produk dengan satu upsert
+(INSERT ... ON CONFLICT (cart_id, product_id) DO UPDATE SET quantity = quantity + 1)
+lalu menggeser total Cart dengan satu UPDATE ... RETURNING, jadi klik ganda
+atau request bersamaan tidak kehilangan increment dan total yang dikembalikan
+adalah nilai terbaru di database. Database tanpa ON CONFLICT/RETURNING memakai
+update-dengan-F() lalu insert.
+
+apply_operations menjalankan daftar operasi add/set/remove dari API batch dalam
+satu transaksi: operasi dilipat dulu di memori menjadi quantity akhir per
+produk, lalu ditulis dengan bulk_create, bulk_update dan satu DELETE.
+"""
+import uuid
+from decimal import Decimal
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from cart.models import Cart, CartItem
+from cart.totals import adjust_totals
+from main.models import Product
+
+UPSERT_VENDORS = ('sqlite', 'postgresql')
+
+
+def _decimal(value):
+    # SQLite mengembalikan kolom decimal sebagai float/int
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def unit_price(product):
+    return product.special_price or product.old_price
+
+
+def _db_value(field_name, value):
+    return CartItem._meta.get_field(field_name).get_db_prep_save(value, connection)
+
+
+def _add_item_upsert(cart, product):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO cart_cartitem (cart_id, product_id, quantity, price) VALUES (%s, %s, 1, %s) '
+            'ON CONFLICT (cart_id, product_id) DO UPDATE SET quantity = cart_cartitem.quantity + 1 '
+            'RETURNING quantity, price',
+            [cart.pk, _db_value('product', product.pk), _db_value('price', unit_price(product))],
+        )
+        quantity, price = cursor.fetchone()
+        cursor.execute(
+            'UPDATE cart_cart SET item_count = item_count + 1, total_amount = total_amount + %s, updated_at = %s '
+            'WHERE id = %s RETURNING item_count, total_amount',
+            [_decimal(price), timezone.now(), cart.pk],
+        )
+        cart.item_count, total_amount = cursor.fetchone()
+    cart.total_amount = _decimal(total_amount)
+    return quantity
+
+
+def _add_item_fallback(cart, product):
+    items = CartItem.objects.filter(cart=cart, product=product)
+    if not items.update(quantity=F('quantity') + 1):
+        try:
+            with transaction.atomic():
+                # create() mengirim signal yang sudah menggeser total cart
+                CartItem.objects.create(cart=cart, product=product, price=unit_price(product))
+                cart.refresh_from_db(fields=['item_count', 'total_amount'])
+                return 1
+        except IntegrityError:
+            # Request lain baru saja membuat item yang sama
+            items.update(quantity=F('quantity') + 1)
+    quantity, price = items.values_list('quantity', 'price').get()
+    adjust_totals(cart.pk, 1, price)
+    cart.refresh_from_db(fields=['item_count', 'total_amount'])
+    return quantity
+
+
+def add_item(cart, product):
+    """
+    Tambah satu unit product ke cart secara atomik. Mengembalikan quantity item
+    setelah ditambah; cart.item_count/total_amount ikut diisi nilai terbaru.
+    """
+    upsert = connection.vendor in UPSERT_VENDORS and connection.features.can_return_columns_from_insert
+    with transaction.atomic():
+        if upsert:
+            return _add_item_upsert(cart, product)
+        return _add_item_fallback(cart, product)
+
+
+# ========== BATCH ==========
+
+OPERATIONS = ('add', 'set', 'remove')
+
+
+class InvalidOperation(ValueError):
+    pass
+
+
+def _parse_operation(index, raw):
+    prefix = f'operations[{index}]'
+    if not isinstance(raw, dict) or raw.get('op') not in OPERATIONS:
+        raise InvalidOperation(f'{prefix}: op must be one of {", ".join(OPERATIONS)}')
+    op = raw['op']
+
+    # add selalu lewat product_id; set/remove boleh item_id (seperti API per item) atau product_id
+    if raw.get('product_id') is not None:
+        kind, parse = 'product', lambda value: uuid.UUID(str(value))
+    elif raw.get('item_id') is not None and op != 'add':
+        kind, parse = 'item', int
+    else:
+        raise InvalidOperation(f'{prefix}: {"product_id" if op == "add" else "item_id or product_id"} is required')
+    try:
+        key = parse(raw[f'{kind}_id'])
+    except (TypeError, ValueError):
+        raise InvalidOperation(f'{prefix}: invalid {kind}_id')
+
+    quantity = raw.get('quantity', 1 if op == 'add' else None)
+    if op != 'remove' and (isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1):
+        raise InvalidOperation(f'{prefix}: quantity must be an integer of at least 1')
+    return op, (kind, key), quantity
+
+
+def apply_operations(user, operations):
+    """
+    Jalankan operasi [{"op": "add"|"set"|"remove", "product_id"/"item_id": ..., "quantity": n}, ...]
+    berurutan pada cart milik user. Semua atau tidak sama sekali: operasi yang tidak valid
+    melempar InvalidOperation dan tidak ada yang tersimpan. Mengembalikan cart.
+    """
+    parsed = [_parse_operation(index, raw) for index, raw in enumerate(operations)]
+    with transaction.atomic():
+        # Kunci baris cart supaya batch lain untuk user yang sama menunggu
+        cart, _ = Cart.objects.select_for_update().get_or_create(user=user)
+        existing = {item.product_id: item for item in CartItem.objects.filter(cart=cart)}
+        product_by_item = {item.pk: product_id for product_id, item in existing.items()}
+        wanted = {ref[1] for op, ref, _ in parsed if op == 'add'} - existing.keys()
+        products = Product.objects.only('id', 'old_price', 'special_price').in_bulk(wanted)
+
+        quantities = {product_id: item.quantity for product_id, item in existing.items()}
+        for index, (op, (kind, key), quantity) in enumerate(parsed):
+            product_id = product_by_item.get(key) if kind == 'item' else key
+            if op == 'add':
+                if product_id not in existing and product_id not in products:
+                    raise InvalidOperation(f'operations[{index}]: product not found')
+                quantities[product_id] = quantities.get(product_id, 0) + quantity
+            elif not quantities.get(product_id):
+                raise InvalidOperation(f'operations[{index}]: item is not in the cart')
+            else:
+                quantities[product_id] = quantity if op == 'set' else 0
+
+        created, updated, removed = [], [], []
+        count_delta, amount_delta = 0, Decimal('0.00')
+        for product_id, quantity in quantities.items():
+            item = existing.get(product_id)
+            if item is None:
+                if quantity:
+                    created.append(CartItem(cart=cart, product_id=product_id, quantity=quantity,
+                                            price=unit_price(products[product_id])))
+                    count_delta += quantity
+                    amount_delta += quantity * created[-1].price
+            elif not quantity:
+                removed.append(item.pk)
+            elif quantity != item.quantity:
+                count_delta += quantity - item.quantity
+                amount_delta += (quantity - item.quantity) * item.price
+                item.quantity = quantity
+                updated.append(item)
+
+        # bulk_create/bulk_update tidak mengirim signal, jadi totalnya digeser sekali di sini;
+        # DELETE tetap lewat signal post_delete
+        CartItem.objects.bulk_create(created)
+        CartItem.objects.bulk_update(updated, ['quantity'])
+        adjust_totals(cart.pk, count_delta, amount_delta)
+        if removed:
+            CartItem.objects.filter(pk__in=removed).delete()
+        cart.refresh_from_db(fields=['item_count', 'total_amount', 'updated_at'])
+    return cart
@@ -0,0 +1,61 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from cart.models import CartItem
+from cart.totals import adjust_totals, rebuild_totals
+
+TRACKED_FIELDS = ('cart_id', 'quantity', 'price')
+
+
+def _normalized(values):
+    # Django menerima string untuk quantity/price (misalnya price='10.00'), jadi nilainya diubah
+    # ke tipe field dulu supaya perkalian tidak menjadi pengulangan string
+    return tuple(
+        None if value is None else CartItem._meta.get_field(field).to_python(value)
+        for field, value in zip(('cart', 'quantity', 'price'), values)
+    )
+
+
+def _current(instance):
+    return _normalized((instance.cart_id, instance.quantity, instance.price))
+
+
+def _cached_cart(instance):
+    # Cart yang sudah ada di memori (misalnya dari get_or_create di view) ikut diperbarui
+    return instance._state.fields_cache.get('cart')
+
+
+@receiver(post_init, sender=CartItem)
+def remember_item_totals(sender, instance, **kwargs):
+    # Lewat __dict__ supaya field yang di-defer tidak memicu query tambahan
+    instance._totals_snapshot = _normalized(instance.__dict__.get(field) for field in TRACKED_FIELDS)
+
+
+@receiver(post_save, sender=CartItem)
+def update_cart_totals_on_save(sender, instance, created, **kwargs):
+    cart_id, quantity, price = instance._totals_snapshot
+    new_cart_id, new_quantity, new_price = _current(instance)
+    if created:
+        adjust_totals(new_cart_id, new_quantity, new_quantity * new_price, _cached_cart(instance))
+    elif None in instance._totals_snapshot:
+        # Nilai lama tidak diketahui (field di-defer), hitung ulang cart ini saja
+        rebuild_totals([new_cart_id])
+    elif cart_id != new_cart_id:
+        adjust_totals(cart_id, -quantity, -quantity * price)
+        adjust_totals(new_cart_id, new_quantity, new_quantity * new_price, _cached_cart(instance))
+    else:
+        adjust_totals(
+            new_cart_id,
+            new_quantity - quantity,
+            new_quantity * new_price - quantity * price,
+            _cached_cart(instance),
+        )
+    remember_item_totals(sender, instance)
+
+
+@receiver(post_delete, sender=CartItem)
+def update_cart_totals_on_delete(sender, instance, **kwargs):
+    cart_id, quantity, price = instance._totals_snapshot
+    if None in instance._totals_snapshot:
+        rebuild_totals([instance.cart_id])
+    else:
+        adjust_totals(cart_id, -quantity, -quantity * price, _cached_cart(instance))
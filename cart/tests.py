@@ -1,8 +1,13 @@
+import json
 from decimal import Decimal
+from io import StringIO
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
 from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from unittest.mock import patch
 from main.models import Product
 from cart.models import Cart, CartItem
@@ -286,4 +291,220 @@ class CartExtraTests(TestCase):
     def test_checkout_review_cart_empty_redirect(self):
         # Kosongkan cart
         response = self.client.get(reverse('cart:checkout_review'))
-        self.assertEqual(response.status_code, 302)
\ No newline at end of file
+        self.assertEqual(response.status_code, 302)
+
+
+class CartTotalsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='totals', password='12345')
+        self.user.profile.role = 'buyer'
+        self.user.profile.save()
+        self.cart = Cart.objects.create(user=self.user)
+        self.product1 = Product.objects.create(product_name='Bat', old_price=100, special_price=80, stock=5)
+        self.product2 = Product.objects.create(product_name='Glove', old_price=50, special_price=40, stock=5)
+
+    def assertStoredTotals(self, count, amount):
+        cart = Cart.objects.get(pk=self.cart.pk)
+        self.assertEqual(cart.total_items, count)
+        self.assertEqual(cart.total_price, Decimal(amount))
+
+    def test_totals_follow_item_mutations(self):
+        item1 = CartItem.objects.create(cart=self.cart, product=self.product1, price=Decimal('80.00'), quantity=2)
+        item2 = CartItem.objects.create(cart=self.cart, product=self.product2, price=Decimal('40.00'), quantity=1)
+        self.assertStoredTotals(3, '200.00')
+
+        item1.quantity = 5
+        item1.save()
+        self.assertStoredTotals(6, '440.00')
+
+        item2.delete()
+        self.assertStoredTotals(5, '400.00')
+
+        self.cart.items.all().delete()
+        self.assertStoredTotals(0, '0.00')
+
+    def test_string_values_are_normalized(self):
+        item = CartItem.objects.create(cart=self.cart, product=self.product1, price='10.00', quantity=2)
+        self.assertStoredTotals(2, '20.00')
+        item.price = '12.50'
+        item.save()
+        self.assertStoredTotals(2, '25.00')
+
+    def test_product_delete_cascades_into_totals(self):
+        CartItem.objects.create(cart=self.cart, product=self.product1, price=Decimal('80.00'), quantity=2)
+        self.product1.delete()
+        self.assertStoredTotals(0, '0.00')
+
+    def test_totals_read_without_queries(self):
+        CartItem.objects.create(cart=self.cart, product=self.product1, price=Decimal('80.00'), quantity=2)
+        cart = Cart.objects.get(pk=self.cart.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(cart.total_items, 2)
+            self.assertEqual(cart.total_price, Decimal('160.00'))
+
+    def test_add_to_cart_returns_updated_total(self):
+        self.client.login(username='totals', password='12345')
+        self.client.get(reverse('cart:add_to_cart', args=[self.product1.id]))
+        response = self.client.get(reverse('cart:add_to_cart', args=[self.product1.id]))
+        self.assertEqual(response.json()['total_price'], 160.0)
+        self.assertStoredTotals(2, '160.00')
+
+    def test_rebuild_command_repairs_drift(self):
+        CartItem.objects.create(cart=self.cart, product=self.product1, price=Decimal('80.00'), quantity=2)
+        # update() massal melewati signal
+        CartItem.objects.filter(cart=self.cart).update(quantity=4)
+        self.assertStoredTotals(2, '160.00')
+
+        call_command('rebuild_cart_totals', stdout=StringIO())
+        self.assertStoredTotals(4, '320.00')
+
+
+class AddItemUpsertTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='upsert', password='12345')
+        self.cart = Cart.objects.create(user=self.user)
+        self.product = Product.objects.create(product_name='Shuttle', old_price=100, special_price=80, stock=5)
+
+    def _add_twice(self):
+        from cart.operations import add_item
+        self.assertEqual(add_item(self.cart, self.product), 1)
+        # Harga di item tetap harga saat pertama ditambahkan
+        self.product.special_price = 70
+        self.assertEqual(add_item(self.cart, self.product), 2)
+
+        item = CartItem.objects.get(cart=self.cart, product=self.product)
+        self.assertEqual((item.quantity, item.price), (2, Decimal('80.00')))
+        self.assertEqual((self.cart.total_items, self.cart.total_price), (2, Decimal('160.00')))
+        stored = Cart.objects.get(pk=self.cart.pk)
+        self.assertEqual((stored.total_items, stored.total_price), (2, Decimal('160.00')))
+
+    def test_add_item_upserts_and_returns_totals(self):
+        self._add_twice()
+
+    def test_add_item_fallback_without_upsert(self):
+        with patch('cart.operations.UPSERT_VENDORS', ()):
+            self._add_twice()
+
+    def test_increment_is_two_statements(self):
+        from cart.operations import add_item
+        add_item(self.cart, self.product)
+        with CaptureQueriesContext(connection) as ctx:
+            add_item(self.cart, self.product)
+        statements = [q['sql'] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(len(statements), 2)
+
+    def test_api_add_to_cart_reports_quantity(self):
+        self.client.login(username='upsert', password='12345')
+        url = reverse('cart:api_add_to_cart', args=[self.product.id])
+        self.client.post(url)
+        data = self.client.post(url).json()
+        self.assertEqual((data['quantity'], data['total_items'], data['total_price']), (2, 2, 160.0))
+
+
+class CartBatchApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='batch', password='12345')
+        self.user.profile.role = 'buyer'
+        self.user.profile.save()
+        self.client.login(username='batch', password='12345')
+        self.cart = Cart.objects.create(user=self.user)
+        self.ball = Product.objects.create(product_name='Ball', old_price=100, special_price=90, stock=5)
+        self.net = Product.objects.create(product_name='Net', old_price=50, special_price=40, stock=5)
+        self.item = CartItem.objects.create(cart=self.cart, product=self.ball, price=Decimal('90.00'), quantity=1)
+
+    def _post(self, operations):
+        return self.client.post(reverse('cart:api_batch_cart'), data=json.dumps({'operations': operations}),
+                                content_type='application/json')
+
+    def test_applies_operations_in_order(self):
+        response = self._post([
+            {'op': 'add', 'product_id': str(self.net.id), 'quantity': 2},
+            {'op': 'add', 'product_id': str(self.net.id)},
+            {'op': 'set', 'item_id': self.item.id, 'quantity': 4},
+            {'op': 'remove', 'product_id': str(self.ball.id)},
+            {'op': 'add', 'product_id': str(self.ball.id)},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        quantities = {row['product_name']: row['quantity'] for row in data['items']}
+        self.assertEqual(quantities, {'Ball': 1, 'Net': 3})
+        self.assertEqual((data['total_items'], data['total_price']), (4, 210.0))
+
+        cart = Cart.objects.get(pk=self.cart.pk)
+        self.assertEqual((cart.total_items, cart.total_price), (4, Decimal('210.00')))
+
+    def test_remove_keeps_totals_consistent(self):
+        data = self._post([{'op': 'remove', 'item_id': self.item.id}]).json()
+        self.assertEqual((data['items'], data['total_items'], data['total_price']), ([], 0, 0.0))
+        self.assertFalse(CartItem.objects.filter(pk=self.item.pk).exists())
+
+    def test_invalid_operation_rolls_back_everything(self):
+        other = Cart.objects.create(user=User.objects.create_user('other', password='12345'))
+        foreign = CartItem.objects.create(cart=other, product=self.net, price=Decimal('40.00'), quantity=1)
+        for operation in [
+            {'op': 'remove', 'item_id': foreign.id},
+            {'op': 'set', 'item_id': self.item.id, 'quantity': 0},
+            {'op': 'add', 'product_id': '00000000-0000-0000-0000-000000000000'},
+            {'op': 'explode', 'item_id': self.item.id},
+        ]:
+            response = self._post([{'op': 'add', 'product_id': str(self.net.id)}, operation])
+            self.assertEqual(response.status_code, 400, operation)
+            self.assertIn('operations[1]', response.json()['error'])
+        self.assertEqual(list(self.cart.items.values_list('product__product_name', 'quantity')), [('Ball', 1)])
+        self.assertEqual(Cart.objects.get(pk=self.cart.pk).total_items, 1)
+
+    def test_rejects_bad_payloads(self):
+        url = reverse('cart:api_batch_cart')
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(url, data='nope', content_type='application/json').status_code, 400)
+        self.assertEqual(self._post({'op': 'add'}).status_code, 400)
+        with self.settings(CART_BATCH_MAX_OPERATIONS=1):
+            self.assertEqual(self._post([{'op': 'remove', 'item_id': self.item.id}] * 2).status_code, 400)
+
+
+class CartQueryBudgetTests(TestCase):
+    """Jumlah query halaman/JSON cart tidak boleh bertambah mengikuti jumlah item."""
+    LINES = 50
+    BUDGET = 3
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='budget', password='12345')
+        self.user.profile.role = 'buyer'
+        self.user.profile.address = 'Jl. Margonda'
+        self.user.profile.save()
+        self.cart = Cart.objects.create(user=self.user)
+        products = Product.objects.bulk_create([
+            Product(product_name=f'Item {i}', old_price=10, special_price=10, stock=5) for i in range(self.LINES)
+        ])
+        CartItem.objects.bulk_create([
+            CartItem(cart=self.cart, product=product, price=Decimal('10.00'), quantity=1) for product in products
+        ])
+        self.client.login(username='budget', password='12345')
+
+    def assertWithinBudget(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        # Query session dan user milik middleware autentikasi tidak dihitung
+        queries = [
+            q['sql'] for q in ctx.captured_queries
+            if 'django_session' not in q['sql'] and 'FROM "auth_user"' not in q['sql']
+        ]
+        self.assertLessEqual(len(queries), self.BUDGET, '\n'.join(queries))
+        return response
+
+    def test_view_cart(self):
+        response = self.assertWithinBudget(reverse('cart:view_cart'))
+        self.assertContains(response, 'Item 49')
+
+    def test_checkout_review(self):
+        response = self.assertWithinBudget(reverse('cart:checkout_review'))
+        self.assertEqual(len(response.context['items']), self.LINES)
+
+    def test_api_get_cart(self):
+        response = self.assertWithinBudget(reverse('cart:api_get_cart'))
+        self.assertEqual(len(response.json()['items']), self.LINES)
+
+    def test_api_checkout_review(self):
+        response = self.assertWithinBudget(reverse('cart:api_checkout_review'))
+        self.assertEqual(len(response.json()['items']), self.LINES)
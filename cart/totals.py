@@ -0,0 +1,62 @@
+"""
+Total keranjang (item_count / total_amount) yang disimpan langsung di Cart.
+
+Setiap mutasi CartItem (signal di cart/signals.py) menggeser kolom tersebut
+dengan satu UPDATE berbasis F(), jadi perubahan bersamaan tidak saling menimpa
+dan Cart.total_price/total_items cukup membaca kolom tanpa query tambahan.
+Operasi massal yang melewati signal (QuerySet.update, bulk_create) harus
+memanggil adjust_totals sendiri atau rebuild_totals sesudahnya.
+"""
+from decimal import Decimal
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from cart.models import Cart, CartItem
+
+ZERO = Decimal('0.00')
+
+
+def adjust_totals(cart_id, count, amount, cart=None):
+    """Geser total cart_id sebesar count item dan amount rupiah. cart: instance yang ikut disesuaikan di memori."""
+    amount = Decimal(amount)
+    if not count and not amount:
+        return
+    Cart.objects.filter(pk=cart_id).update(
+        item_count=F('item_count') + count,
+        total_amount=F('total_amount') + amount,
+        updated_at=timezone.now(),
+    )
+    if cart is not None:
+        cart.item_count += count
+        cart.total_amount = Decimal(cart.total_amount) + amount
+
+
+def _item_totals():
+    items = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    count = items.annotate(total=Sum('quantity')).values('total')
+    amount = items.annotate(
+        total=Sum(F('quantity') * F('price'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    ).values('total')
+    return {
+        'item_count': Coalesce(Subquery(count), Value(0)),
+        'total_amount': Coalesce(Subquery(amount), Value(ZERO), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    }
+
+
+def rebuild_totals(carts=None):
+    """
+    Hitung ulang total dari CartItem untuk cart yang nilainya melenceng.
+    carts: queryset/list pk untuk membatasi, None = semua. Mengembalikan jumlah cart yang dibetulkan.
+    """
+    queryset = Cart.objects.all()
+    if carts is not None:
+        queryset = queryset.filter(pk__in=carts)
+    totals = _item_totals()
+    stale = list(
+        queryset.annotate(actual_count=totals['item_count'], actual_amount=totals['total_amount'])
+        .exclude(item_count=F('actual_count'), total_amount=F('actual_amount'))
+        .values_list('pk', flat=True)
+    )
+    if stale:
+        Cart.objects.filter(pk__in=stale).update(**totals)
+    return len(stale)
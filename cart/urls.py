@@ -17,6 +17,7 @@ urlpatterns = [
     path('api/cart/add/<uuid:product_id>/', views.api_add_to_cart, name='api_add_to_cart'),
     path('api/cart/update/<int:item_id>/', views.api_update_cart_item, name='api_update_cart_item'),
     path('api/cart/remove/<int:item_id>/', views.api_remove_from_cart, name='api_remove_from_cart'),
+    path('api/cart/batch/', views.api_batch_cart, name='api_batch_cart'),
     path('api/cart/checkout/', views.api_checkout_cart, name='api_checkout_cart'),
     path('checkout-review-json/', views.api_checkout_review, name='api_checkout_review'),
 ]
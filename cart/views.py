@@ -1,15 +1,34 @@
+import json
+from django.conf import settings
 from django.http import JsonResponse
 from django.contrib import messages
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden
 from .models import Cart, CartItem
+from .operations import InvalidOperation, add_item, apply_operations
 from main.models import Product
 from payment.models import Transaction, TransactionProduct
 from payment.views import create_transaction_from_cart
 from django.views.decorators.csrf import csrf_exempt
 
-def is_buyer(user):
+# Field produk yang dipakai halaman/JSON cart; sisanya tidak perlu ikut dimuat
+LINE_PRODUCT_FIELDS = ('product__id', 'product__product_name')
+
+
+def cart_lines(cart):
+    """Item cart beserta produknya dalam satu query (select_related), urut sesuai waktu ditambahkan."""
+    return list(
+        cart.items.select_related('product')
+        .only('id', 'cart_id', 'product_id', 'quantity', 'price', *LINE_PRODUCT_FIELDS)
+        .order_by('id')
+    )
+
+
+def is_buyer(user, user_context=None):
+    """user_context: data session dari request.user_context, supaya profile tidak perlu di-query."""
+    if user_context is not None:
+        return user_context['role'] == 'buyer'
     try:
         return hasattr(user, 'profile') and user.profile.role == 'buyer'
     except Exception:
@@ -18,13 +37,13 @@ def is_buyer(user):
 
 @login_required
 def view_cart(request):
-    if not is_buyer(request.user):
+    if not is_buyer(request.user, request.user_context):
         return HttpResponseForbidden("Only buyer that allow to access cart.")
 
     cart, _ = Cart.objects.get_or_create(user=request.user)
     context = {
         'cart': cart,
-        'items': cart.items.all(),
+        'items': cart_lines(cart),
         'total_price': cart.total_price,
     }
     return render(request, 'view_cart.html', context)
@@ -32,31 +51,24 @@ def view_cart(request):
 
 @login_required
 def add_to_cart(request, product_id):
-    if not is_buyer(request.user):
+    if not is_buyer(request.user, request.user_context):
         return JsonResponse({'success': False, 'error': 'Only buyer that allow to add to cart.'}, status=403)
 
     product = get_object_or_404(Product, id=product_id)
     cart, _ = Cart.objects.get_or_create(user=request.user)
-    product_price = product.special_price or product.old_price
-
-    item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        defaults={'price': product_price}
-    )
-    if not created:
-        item.quantity += 1
-        item.save()
+    quantity = add_item(cart, product)
 
     return JsonResponse({
         'success': True,
         'message': f"{product.product_name} successfully added to cart.",
-        'total_price': float(cart.total_price)
+        'total_price': float(cart.total_price),
+        'total_items': cart.total_items,
+        'quantity': quantity,
     })
 
 @login_required
 def update_cart_item(request, item_id):
-    if not is_buyer(request.user):
+    if not is_buyer(request.user, request.user_context):
         return JsonResponse({'success': False, 'error': 'Only buyer that allow to change the total item.'}, status=403)
 
     item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
@@ -89,7 +101,7 @@ def update_cart_item(request, item_id):
 
 @login_required
 def remove_from_cart(request, item_id):
-    if not is_buyer(request.user):
+    if not is_buyer(request.user, request.user_context):
         return JsonResponse({'success': False, 'error': 'Only buyer that allow to remove item.'}, status=403)
 
     item = get_object_or_404(CartItem, id=item_id, cart__user=request.user)
@@ -121,11 +133,12 @@ def checkout_cart(request):
 
 @login_required
 def checkout_review(request):
-    if not is_buyer(request.user):
+    if not is_buyer(request.user, request.user_context):
         return HttpResponseForbidden("Only buyer that allow to checkout.")
 
     cart = getattr(request.user, 'cart', None)
-    if not cart or not cart.items.exists():
+    lines = cart_lines(cart) if cart else []
+    if not lines:
         messages.warning(request, "Your cart is empty.")
         return redirect('cart:view_cart')
 
@@ -133,7 +146,7 @@ def checkout_review(request):
         items_data = []
         total = 0
         
-        for item in cart.items.all():
+        for item in lines:
             subtotal = item.quantity * item.price
             total += subtotal
             items_data.append({
@@ -147,7 +160,7 @@ def checkout_review(request):
         # Store in session
         request.session['order_total'] = float(total)
         request.session['order_items'] = items_data
-        request.session['order_address'] = request.user.profile.address or '-'
+        request.session['order_address'] = request.user_context['address'] or '-'
         
         # Clear cart
         cart.items.all().delete()
@@ -159,7 +172,7 @@ def checkout_review(request):
     # Handle GET request - Show checkout review page
     items_data = []
     total = 0
-    for item in cart.items.all():
+    for item in lines:
         subtotal = item.quantity * item.price
         total += subtotal
         items_data.append({
@@ -171,16 +184,14 @@ def checkout_review(request):
 
     context = {
         'user': request.user,
-        'address': request.user.profile.address,
+        'address': request.user_context['address'],
         'items': items_data,
         'total': total
     }
     return render(request, 'checkout_review.html', context)
 
-@login_required
-def api_get_cart(request):
-    """Ambil isi cart untuk Flutter."""
-    cart, _ = Cart.objects.get_or_create(user=request.user)
+def cart_payload(cart):
+    """Isi cart dalam bentuk JSON untuk Flutter."""
     items_data = [
         {
             'item_id': item.id,
@@ -189,14 +200,53 @@ def api_get_cart(request):
             'quantity': item.quantity,
             'price': float(item.price),
             'subtotal': float(item.quantity * item.price)
-        } for item in cart.items.all()
+        } for item in cart_lines(cart)
     ]
-    return JsonResponse({
+    return {
         'success': True,
         'items': items_data,
         'total_price': float(cart.total_price),
         'total_items': cart.total_items
-    })
+    }
+
+
+@login_required
+def api_get_cart(request):
+    """Ambil isi cart untuk Flutter."""
+    cart, _ = Cart.objects.get_or_create(user=request.user)
+    return JsonResponse(cart_payload(cart))
+
+
+@login_required
+@csrf_exempt
+def api_batch_cart(request):
+    """
+    Jalankan beberapa perubahan cart dari Flutter dalam satu request dan satu transaksi.
+    Body: {"operations": [{"op": "add", "product_id": ..., "quantity": 2},
+                          {"op": "set", "item_id": 5, "quantity": 3},
+                          {"op": "remove", "product_id": ...}]}
+    Respons sama dengan api_get_cart. Kalau satu operasi tidak valid, tidak ada yang disimpan.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'Method not allowed.'}, status=405)
+    if not is_buyer(request.user, request.user_context):
+        return JsonResponse({'success': False, 'error': 'Only buyer that allow to change the cart.'}, status=403)
+
+    try:
+        operations = json.loads(request.body or b'{}').get('operations')
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'Invalid JSON body.'}, status=400)
+    if not isinstance(operations, list):
+        return JsonResponse({'success': False, 'error': 'operations must be a list.'}, status=400)
+    limit = getattr(settings, 'CART_BATCH_MAX_OPERATIONS', 100)
+    if len(operations) > limit:
+        return JsonResponse({'success': False, 'error': f'At most {limit} operations per request.'}, status=400)
+
+    try:
+        cart = apply_operations(request.user, operations)
+    except InvalidOperation as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    return JsonResponse(cart_payload(cart))
 
 
 @login_required
@@ -208,21 +258,14 @@ def api_add_to_cart(request, product_id):
 
     product = get_object_or_404(Product, id=product_id)
     cart, _ = Cart.objects.get_or_create(user=request.user)
-    product_price = product.special_price or product.old_price
-
-    item, created = CartItem.objects.get_or_create(
-        cart=cart,
-        product=product,
-        defaults={'price': product_price}
-    )
-    if not created:
-        item.quantity += 1
-        item.save()
+    quantity = add_item(cart, product)
 
     return JsonResponse({
         'success': True,
         'message': f"{product.product_name} added to cart",
-        'total_price': float(cart.total_price)
+        'total_price': float(cart.total_price),
+        'total_items': cart.total_items,
+        'quantity': quantity,
     })
 
 
@@ -306,7 +349,7 @@ def api_checkout_review(request):
     items = []
     total = 0
     if cart:
-        for item in cart.items.all():
+        for item in cart_lines(cart):
             subtotal = float(item.quantity * item.price)
             total += subtotal
             items.append({
@@ -319,7 +362,7 @@ def api_checkout_review(request):
     return JsonResponse({
         'user': {
             'username': request.user.username,
-            'address': request.user.profile.address or '-',
+            'address': request.user_context['address'] or '-',
         },
         'items': items,
         'total': total
@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'football_site.settings')
+# Di bawah ASGI, /proxy-image/ memakai view async (main.views.proxy_image_async)
+os.environ.setdefault('IMAGE_PROXY_ASYNC', 'True')
 
 application = get_asgi_application()
@@ -69,6 +69,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.user_context.UserContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -85,6 +86,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'main.user_context.user_context',
             ],
         },
     },
@@ -187,3 +189,72 @@ SESSION_COOKIE_SAMESITE = "None"
 
 CSRF_COOKIE_SECURE = True
 SESSION_COOKIE_SECURE = True
+
+# Keyset pagination untuk katalog produk (/json/page/)
+PRODUCT_PAGE_SIZE = int(os.getenv('PRODUCT_PAGE_SIZE', 24))
+PRODUCT_PAGE_SIZE_MAX = 100
+
+# Jumlah baris per fetch untuk export katalog streaming (/export/...)
+PRODUCT_EXPORT_CHUNK_SIZE = 2000
+
+# Backend full-text search produk (lihat main/search.py): FTS5 di SQLite, tsvector + GIN di PostgreSQL
+PRODUCT_SEARCH_BACKEND = 'postgres' if PRODUCTION else 'sqlite_fts5'
+# Halaman /search/ terjauh yang dilayani; di atasnya dikembalikan halaman kosong
+PRODUCT_SEARCH_MAX_PAGE = 1000
+
+# Index autocomplete in-memory dibangun ulang per worker setelah interval ini (detik)
+AUTOCOMPLETE_REFRESH_SECONDS = 300
+
+# Cache gambar untuk /proxy-image/ di disk lokal (LRU, dibatasi ukuran total)
+IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR', str(BASE_DIR / '.image_cache'))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv('IMAGE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# TTL kalau upstream tidak mengirim max-age (detik)
+IMAGE_CACHE_DEFAULT_TTL = 24 * 60 * 60
+# max-age yang kita kirim ke browser untuk gambar hasil proxy (detik)
+IMAGE_PROXY_BROWSER_MAX_AGE = 7 * 24 * 60 * 60
+# Batas ukuran gambar upstream yang mau diteruskan/disimpan (byte)
+IMAGE_PROXY_MAX_BYTES = 10 * 1024 * 1024
+# Pool koneksi keep-alive ke host gambar: jumlah host dan koneksi per host
+IMAGE_PROXY_POOL_HOSTS = 16
+IMAGE_PROXY_POOL_SIZE = 10
+
+# Varian thumbnail /proxy-image/?w=&h=&fmt= (butuh Pillow): ukuran dibulatkan ke atas ke daftar ini
+THUMBNAIL_SIZES = (160, 320, 480, 640, 960, 1280)
+THUMBNAIL_QUALITY = 80
+# Timeout (connect, read) ke host gambar; circuit breaker per host dan negative cache per URL
+IMAGE_PROXY_TIMEOUT = (3, 10)
+IMAGE_PROXY_BREAKER_THRESHOLD = 5
+IMAGE_PROXY_BREAKER_RESET_SECONDS = 30
+IMAGE_PROXY_NEGATIVE_TTL = 60
+
+# View async untuk /proxy-image/ (httpx); otomatis aktif lewat football_site/asgi.py
+IMAGE_PROXY_ASYNC = os.getenv('IMAGE_PROXY_ASYNC', 'False').lower() == 'true'
+# Batas fetch upstream bersamaan per worker ASGI
+IMAGE_PROXY_ASYNC_CONCURRENCY = 200
+
+# Aturan klasifikasi kategori produk dapat diganti di sini: daftar (kategori, [keyword]) berurutan prioritas.
+# Default ada di main/categories.py (DEFAULT_RULES).
+# PRODUCT_CATEGORY_RULES = [...]
+
+# Cache Django bersama antar worker untuk version stamp product_cache dan user_context (main/shared_cache.py).
+# Tanpa REDIS_URL dipakai LocMemCache per proses, yang di PRODUCTION diabaikan (data dibaca dari database).
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Cache pembacaan Product per id (main/product_cache.py): entry LRU per worker dan TTL di cache Django (detik)
+PRODUCT_CACHE_SIZE = 2048
+PRODUCT_CACHE_TTL = 300
+# Umur maksimum entry LRU per worker (detik), batas basi kalau invalidasi terlewat
+PRODUCT_CACHE_LOCAL_TTL = 5
+
+# Jumlah maksimum id per request /json/batch/
+PRODUCT_BATCH_MAX = 100
+
+# Jumlah maksimum operasi per request /cart/api/cart/batch/
+CART_BATCH_MAX_OPERATIONS = 100
@@ -0,0 +1,187 @@
+"""
+Index prefix in-memory untuk autocomplete nama produk dan label kategori.
+
+Index berupa sorted array (bisect) berisi setiap awal kata dari nama produk,
+jadi "rack" cocok dengan "Yonex Badminton Racket". Index dibangun di thread
+latar belakang saat pertama dipakai, lalu di-patch oleh signal Product. Karena
+signal hanya berjalan di worker yang menyimpan produk, index juga dibangun
+ulang di latar belakang setelah AUTOCOMPLETE_REFRESH_SECONDS. Request tidak
+pernah menunggu build: selama build berjalan yang dipakai tetap index lama
+(atau hasil kosong sebelum build pertama di worker itu selesai).
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from django.conf import settings
+from django.db import DatabaseError, connection
+from main.facets import get_facets, normalize_category
+from main.models import Product
+
+logger = logging.getLogger(__name__)
+
+# Batas jumlah key yang diperiksa per query, supaya prefix pendek seperti "a" tetap cepat
+MAX_CANDIDATES = 500
+
+
+def _word_keys(text):
+    words = (text or '').lower().split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []          # sorted list of (key, entry_id)
+        self._entries = {}       # entry_id -> suggestion dict
+        self._keys_by_entry = {} # entry_id -> set of keys
+        self._pending = None     # patch dari signal selama build berjalan, diulang setelah swap
+        self.built_at = None
+
+    @property
+    def is_built(self):
+        return self.built_at is not None
+
+    def is_stale(self):
+        refresh = getattr(settings, 'AUTOCOMPLETE_REFRESH_SECONDS', 300)
+        return not self.is_built or time.monotonic() - self.built_at > refresh
+
+    def reset(self):
+        with self._lock:
+            self._keys, self._entries, self._keys_by_entry = [], {}, {}
+            self.built_at = None
+
+    def _accepts_patches(self):
+        return self.is_built or self._pending is not None
+
+    def build(self):
+        with self._lock:
+            self._pending = []
+        try:
+            self._build()
+        finally:
+            with self._lock:
+                self._pending = None
+
+    def _build(self):
+        keys, entries, keys_by_entry = [], {}, {}
+        products = Product.objects.values_list('id', 'product_name', 'avg_rating').iterator(chunk_size=2000)
+        for pk, name, rating in products:
+            entry_id = f'product:{pk}'
+            entries[entry_id] = {"type": "product", "label": name, "pk": str(pk), "score": rating or 0.0}
+            keys_by_entry[entry_id] = _word_keys(name)
+        for facet in get_facets():
+            entry_id = f"category:{facet['category']}"
+            entries[entry_id] = {
+                "type": "category", "label": facet['category'],
+                "score": float(facet['count'] + facet['external_count']),
+            }
+            keys_by_entry[entry_id] = _word_keys(facet['category'])
+        for entry_id, entry_keys in keys_by_entry.items():
+            keys.extend((key, entry_id) for key in entry_keys)
+        keys.sort()
+
+        with self._lock:
+            self._keys, self._entries, self._keys_by_entry = keys, entries, keys_by_entry
+            # Produk yang disimpan/dihapus saat data dibaca mungkin belum ada di snapshot
+            for apply, args in self._pending:
+                apply(*args)
+            self.built_at = time.monotonic()
+
+    def _remove_entry(self, entry_id):
+        for key in self._keys_by_entry.pop(entry_id, ()):
+            i = bisect_left(self._keys, (key, entry_id))
+            if i < len(self._keys) and self._keys[i] == (key, entry_id):
+                del self._keys[i]
+        self._entries.pop(entry_id, None)
+
+    def _add_entry(self, entry_id, entry, label):
+        keys = _word_keys(label)
+        self._entries[entry_id] = entry
+        self._keys_by_entry[entry_id] = keys
+        for key in keys:
+            insort(self._keys, (key, entry_id))
+
+    def update_products(self, products):
+        if not self._accepts_patches():
+            return
+        products = list(products)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((self._update_products, (products,)))
+            if self.is_built:
+                self._update_products(products)
+
+    def _update_products(self, products):
+        for product in products:
+            entry_id = f'product:{product.pk}'
+            self._remove_entry(entry_id)
+            self._add_entry(entry_id, {
+                "type": "product", "label": product.product_name,
+                "pk": str(product.pk), "score": product.avg_rating or 0.0,
+            }, product.product_name)
+
+            category = normalize_category(product.category)
+            if category and f'category:{category}' not in self._entries:
+                self._add_entry(f'category:{category}', {
+                    "type": "category", "label": category, "score": 1.0,
+                }, category)
+
+    def remove_product(self, pk):
+        if not self._accepts_patches():
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((self._remove_entry, (f'product:{pk}',)))
+            if self.is_built:
+                self._remove_entry(f'product:{pk}')
+
+    def suggest(self, prefix, limit=8):
+        prefix = ' '.join((prefix or '').lower().split())
+        if not prefix:
+            return []
+        with self._lock:
+            i = bisect_left(self._keys, (prefix,))
+            seen = set()
+            candidates = []
+            while i < len(self._keys) and len(seen) < MAX_CANDIDATES:
+                key, entry_id = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                if entry_id not in seen:
+                    seen.add(entry_id)
+                    candidates.append(self._entries[entry_id])
+                i += 1
+        candidates.sort(key=lambda entry: (-entry['score'], entry['label']))
+        return candidates[:limit]
+
+
+index = PrefixIndex()
+_build_lock = threading.Lock()
+_build_thread = None
+
+
+def _build_in_thread():
+    try:
+        index.build()
+    except DatabaseError:
+        # Misalnya tabel belum ada sebelum migrate; dicoba lagi saat index dipakai
+        logger.exception('Autocomplete index build failed')
+    finally:
+        connection.close()
+
+
+def refresh_in_background():
+    """Mulai build index di thread terpisah kalau belum ada yang berjalan. Mengembalikan thread-nya."""
+    global _build_thread
+    with _build_lock:
+        if _build_thread is None or not _build_thread.is_alive():
+            _build_thread = threading.Thread(target=_build_in_thread, name='autocomplete-build', daemon=True)
+            _build_thread.start()
+        return _build_thread
+
+
+def suggest(prefix, limit=8):
+    if index.is_stale():
+        refresh_in_background()
+    return index.suggest(prefix, limit)
@@ -0,0 +1,113 @@
+"""
+Klasifikasi kategori produk dari nama/label, dipakai oleh sync, import_products,
+ingest_catalog dan facet.
+
+Aturan berupa daftar (kategori, keyword) berurutan prioritas, bisa diganti lewat
+settings.PRODUCT_CATEGORY_RULES. Semua keyword dikompilasi menjadi satu regex
+alternation, jadi satu nama cukup dipindai sekali; kategori dengan prioritas
+tertinggi di antara keyword yang cocok yang menang. Hasil diingat per nama yang
+sudah dinormalisasi karena feed biasanya berisi banyak nama yang berulang.
+"""
+import re
+import threading
+from django.conf import settings
+
+DEFAULT_CATEGORY = 'accessory'
+
+# Keyword dicocokkan sebagai substring (huruf kecil). Urutan = prioritas:
+# olahraga spesifik dulu, baru keyword umum seperti "bat"/"ball".
+DEFAULT_RULES = [
+    ('badminton', ['badminton', 'racket', 'racquet', 'shuttle']),
+    ('volleyball', ['volley']),
+    ('basketball', ['basketball']),
+    ('football', ['football', 'soccer', 'futsal', 'shoes']),
+    ('hockey', ['hockey']),
+    ('squash', ['squash']),
+    ('cricket', ['cricket', 'bat', 'ball', 'wicket']),
+    ('accessory', ['kit bag', 'guard', 'glove', 'helmet', 'grip']),
+]
+
+LABELS = {
+    'cricket': 'Cricket',
+    'football': 'Football',
+    'hockey': 'Hockey',
+    'volleyball': 'Volleyball',
+    'basketball': 'Basketball',
+    'badminton': 'Badminton',
+    'accessory': 'Accessory',
+    'squash': 'Squash',
+}
+
+MAX_MEMO = 200_000
+
+
+def normalize_name(name):
+    return ' '.join((name or '').lower().split())
+
+
+def label(category):
+    """Label tampilan ("Badminton") untuk key kategori ("badminton")."""
+    return LABELS.get(category, category.title())
+
+
+class CategoryClassifier:
+    def __init__(self, rules, default=DEFAULT_CATEGORY):
+        self.default = default
+        self._priority = {}
+        for priority, (category, keywords) in enumerate(rules):
+            for keyword in keywords:
+                self._priority.setdefault(keyword.lower(), (priority, category))
+        # Keyword terpanjang dulu supaya "kit bag" tidak kalah oleh keyword yang lebih pendek di posisi yang sama
+        keywords = sorted(self._priority, key=len, reverse=True)
+        self._pattern = re.compile('|'.join(re.escape(k) for k in keywords)) if keywords else None
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def _classify(self, normalized):
+        best = None
+        if self._pattern is not None:
+            # Keyword bisa tumpang tindih ("volleyball" berisi "ball"), jadi cek setiap posisi awal
+            pos = 0
+            while True:
+                match = self._pattern.search(normalized, pos)
+                if match is None:
+                    break
+                candidate = self._priority[match.group()]
+                if best is None or candidate < best:
+                    best = candidate
+                pos = match.start() + 1
+        return best[1] if best else self.default
+
+    def classify(self, name):
+        normalized = normalize_name(name)
+        category = self._memo.get(normalized)
+        if category is None:
+            category = self._classify(normalized)
+            with self._lock:
+                if len(self._memo) >= MAX_MEMO:
+                    self._memo.clear()
+                self._memo[normalized] = category
+        return category
+
+    def classify_many(self, names):
+        """Klasifikasi satu kolom nama sekaligus; nama yang sama hanya dipindai sekali."""
+        classify = self.classify
+        return [classify(name) for name in names]
+
+
+_classifier = None
+
+
+def get_classifier():
+    global _classifier
+    if _classifier is None:
+        _classifier = CategoryClassifier(getattr(settings, 'PRODUCT_CATEGORY_RULES', DEFAULT_RULES))
+    return _classifier
+
+
+def classify(name):
+    return get_classifier().classify(name)
+
+
+def classify_many(names):
+    return get_classifier().classify_many(names)
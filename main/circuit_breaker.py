@@ -0,0 +1,90 @@
+"""
+Perlindungan worker dari host gambar yang lambat atau mati.
+
+CircuitBreaker menghitung kegagalan per host: setelah `threshold` kegagalan
+berturut-turut circuit terbuka dan request ke host itu langsung ditolak selama
+`reset_timeout` detik. Setelah itu satu request percobaan (half-open) boleh
+lewat; kalau berhasil circuit tertutup lagi, kalau gagal terbuka lagi.
+
+NegativeCache mengingat URL yang baru saja gagal (404, 5xx, timeout) selama
+`ttl` detik supaya thumbnail rusak tidak di-fetch ulang di setiap render.
+
+State disimpan per proses (per worker).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=5, reset_timeout=30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._hosts = {}  # host -> {"failures", "state", "opened_at"}
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+    def state(self, host):
+        with self._lock:
+            return self._hosts.get(host, {}).get('state', CLOSED)
+
+    def allow(self, host):
+        with self._lock:
+            info = self._hosts.get(host)
+            if info is None or info['state'] == CLOSED:
+                return True
+            if info['state'] == OPEN and time.monotonic() - info['opened_at'] >= self.reset_timeout:
+                # Izinkan satu request percobaan; yang lain tetap ditolak sampai hasilnya diketahui
+                info['state'] = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self, host):
+        with self._lock:
+            self._hosts.pop(host, None)
+
+    def record_failure(self, host):
+        with self._lock:
+            info = self._hosts.setdefault(host, {'failures': 0, 'state': CLOSED, 'opened_at': 0.0})
+            info['failures'] += 1
+            if info['state'] == HALF_OPEN or info['failures'] >= self.threshold:
+                info['state'] = OPEN
+                info['opened_at'] = time.monotonic()
+
+
+class NegativeCache:
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # url -> (expires_at, pesan error)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+    def add(self, url, error):
+        with self._lock:
+            self._entries.pop(url, None)
+            self._entries[url] = (time.monotonic() + self.ttl, str(error))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, url):
+        """Pesan error kalau URL masih dalam masa negative cache, selain itu None."""
+        with self._lock:
+            item = self._entries.get(url)
+            if item is None:
+                return None
+            expires_at, error = item
+            if time.monotonic() >= expires_at:
+                del self._entries[url]
+                return None
+            return error
@@ -0,0 +1,62 @@
+import json
+from django.conf import settings
+from django.core import serializers
+from django.core.serializers.json import DjangoJSONEncoder
+from main.serializers import PRODUCT_FIELDS, product_rows, row_to_payload
+
+XML_OPEN = '<django-objects version="1.0">'
+XML_CLOSE = '</django-objects>'
+
+
+def get_chunk_size():
+    return getattr(settings, 'PRODUCT_EXPORT_CHUNK_SIZE', 2000)
+
+
+def _iter_payloads(queryset, fields):
+    rows = product_rows(queryset, fields).iterator(chunk_size=get_chunk_size())
+    for row in rows:
+        yield row_to_payload(row, fields)
+
+
+def stream_json_array(queryset, fields=PRODUCT_FIELDS):
+    """Yield JSON array katalog sepotong-sepotong, satu produk per potongan."""
+    yield '['
+    separator = ''
+    for payload in _iter_payloads(queryset, fields):
+        yield separator + json.dumps(payload, cls=DjangoJSONEncoder)
+        separator = ','
+    yield ']'
+
+
+def stream_ndjson(queryset, fields=PRODUCT_FIELDS):
+    for payload in _iter_payloads(queryset, fields):
+        yield json.dumps(payload, cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_xml(queryset):
+    """
+    Yield dokumen XML dengan format django.core.serializers.
+
+    Produk diserialisasi per chunk dengan serializer XML bawaan Django, lalu
+    pembungkus <django-objects> tiap chunk dibuang supaya hasilnya satu dokumen.
+    """
+    chunk_size = get_chunk_size()
+    yield '<?xml version="1.0" encoding="utf-8"?>\n' + XML_OPEN
+
+    chunk = []
+    for product in queryset.iterator(chunk_size=chunk_size):
+        chunk.append(product)
+        if len(chunk) >= chunk_size:
+            yield _xml_body(chunk)
+            chunk = []
+    if chunk:
+        yield _xml_body(chunk)
+
+    yield XML_CLOSE
+
+
+def _xml_body(objects):
+    document = serializers.serialize('xml', objects)
+    start = document.index(XML_OPEN) + len(XML_OPEN)
+    end = document.rindex(XML_CLOSE)
+    return document[start:end]
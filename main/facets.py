@@ -0,0 +1,65 @@
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from main.categories import classify_many
+from main.models import CategoryFacet, Product, ProductsData
+
+INTERNAL = 'internal'
+EXTERNAL = 'external'
+
+
+def normalize_category(category):
+    return (category or '').strip().lower()
+
+
+def adjust_counts(source, deltas):
+    """Tambah/kurangi count per kategori. deltas: mapping kategori -> selisih."""
+    merged = Counter()
+    for category, delta in deltas.items():
+        category = normalize_category(category)
+        if category and delta:
+            merged[category] += delta
+
+    for category, delta in merged.items():
+        facet, _ = CategoryFacet.objects.get_or_create(source=source, category=category)
+        CategoryFacet.objects.filter(pk=facet.pk).update(count=F('count') + delta)
+
+
+def reset_counts(source):
+    CategoryFacet.objects.filter(source=source).delete()
+
+
+def get_facets():
+    """
+    Daftar kategori dengan jumlah produknya, urut berdasarkan nama kategori:
+    [{"category": "cricket", "count": 12, "external_count": 340}, ...]
+    """
+    merged = {}
+    for source, category, count in CategoryFacet.objects.filter(count__gt=0).values_list('source', 'category', 'count'):
+        entry = merged.setdefault(category, {"category": category, "count": 0, "external_count": 0})
+        entry["count" if source == INTERNAL else "external_count"] = count
+    return [merged[category] for category in sorted(merged)]
+
+
+def count_external_categories():
+    from main.sync import EXTERNAL_DB
+    if EXTERNAL_DB not in settings.DATABASES:
+        return Counter()
+    names = ProductsData.objects.using(EXTERNAL_DB).values_list('product_name', flat=True)
+    return Counter(classify_many(names.iterator(chunk_size=2000)))
+
+
+def rebuild_facets(include_external=True):
+    """Hitung ulang semua facet dari nol (dipakai setelah QuerySet.update massal atau sync --full)."""
+    internal = Counter()
+    rows = Product.objects.values('category').annotate(total=Count('id'))
+    for row in rows:
+        internal[normalize_category(row['category'])] += row['total']
+
+    with transaction.atomic():
+        reset_counts(INTERNAL)
+        adjust_counts(INTERNAL, internal)
+        if include_external:
+            reset_counts(EXTERNAL)
+            adjust_counts(EXTERNAL, count_external_categories())
@@ -0,0 +1,53 @@
+import decimal
+from django.db.models.functions import Lower
+
+TRUTHY = {'1', 'true', 'yes', 'on'}
+
+
+class InvalidFilter(ValueError):
+    pass
+
+
+def _parse_price(raw, name):
+    try:
+        value = decimal.Decimal(raw)
+    except decimal.InvalidOperation:
+        raise InvalidFilter(f"Invalid {name}.")
+    if not value.is_finite():
+        raise InvalidFilter(f"Invalid {name}.")
+    return value
+
+
+def filter_products(queryset, params, user=None):
+    """
+    Terapkan filter katalog dari query params:
+    category, seller=me, min_price, max_price, in_stock, q.
+
+    Raise InvalidFilter untuk nilai harga yang tidak valid.
+    """
+    category = (params.get('category') or '').strip().lower()
+    if category and category != 'all':
+        # Dicocokkan lewat LOWER(category) supaya memakai functional index product_category_lower_idx
+        queryset = queryset.alias(category_lower=Lower('category')).filter(category_lower=category)
+
+    if params.get('seller') == 'me':
+        if user is None or not user.is_authenticated:
+            return queryset.none()
+        queryset = queryset.filter(seller=user)
+
+    min_price = params.get('min_price')
+    if min_price:
+        queryset = queryset.filter(special_price__gte=_parse_price(min_price, 'min_price'))
+
+    max_price = params.get('max_price')
+    if max_price:
+        queryset = queryset.filter(special_price__lte=_parse_price(max_price, 'max_price'))
+
+    if (params.get('in_stock') or '').lower() in TRUTHY:
+        queryset = queryset.filter(stock__gt=0)
+
+    q = (params.get('q') or '').strip()
+    if q:
+        queryset = queryset.filter(product_name__icontains=q)
+
+    return queryset
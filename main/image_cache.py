@@ -0,0 +1,241 @@
+"""
+Cache gambar di disk lokal untuk proxy_image.
+
+Setiap entry disimpan sebagai dua file: <key>.bin (isi gambar) dan <key>.json
+(metadata: content type, ETag/Last-Modified upstream, waktu kedaluwarsa, ETag
+milik kita). Key adalah sha256 dari URL (plus varian, kalau ada). Ukuran total
+dibatasi IMAGE_CACHE_MAX_BYTES; saat terlampaui, entry yang paling lama tidak
+diakses (mtime, diperbarui setiap hit) dihapus lebih dulu.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: koalesensi hanya di dalam satu proses
+    fcntl = None
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+@dataclass
+class CachedImage:
+    content_type: str
+    etag: str
+    expires_at: float
+    upstream_etag: str = ''
+    upstream_last_modified: str = ''
+    path: str = ''
+
+    @property
+    def is_fresh(self):
+        return time.time() < self.expires_at
+
+    def open(self):
+        return open(self.path, 'rb')
+
+    def read(self):
+        with self.open() as f:
+            return f.read()
+
+
+def cache_key(url, variant=''):
+    return hashlib.sha256(f'{url}\n{variant}'.encode('utf-8')).hexdigest()
+
+
+class DiskImageCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_size = None
+        self._flights = {}  # key -> [lock, jumlah thread yang menunggu]
+
+    def _paths(self, key):
+        folder = self.directory / key[:2]
+        return folder / f'{key}.bin', folder / f'{key}.json'
+
+    def lock_path(self, key):
+        path = self._paths(key)[0].with_suffix('.lock')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def get(self, key):
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            os.utime(data_path)  # tandai baru diakses untuk LRU
+        except (OSError, ValueError):
+            return None
+        meta['path'] = str(data_path)
+        return CachedImage(**meta)
+
+    def set(self, key, content, content_type, ttl, upstream_etag='', upstream_last_modified='', max_bytes=None):
+        """
+        Simpan gambar. content boleh bytes atau iterable of chunks (misalnya
+        iter_content), ditulis langsung ke file sementara sehingga body tidak
+        pernah dibuffer utuh di memori. Melempar ImageTooLarge kalau melebihi max_bytes.
+        """
+        writer = self.open_writer(key, max_bytes)
+        try:
+            for chunk in [content] if isinstance(content, bytes) else content:
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit(content_type, ttl, upstream_etag, upstream_last_modified)
+
+    def open_writer(self, key, max_bytes=None):
+        """Writer bertahap untuk pemanggil yang menerima chunk sendiri (misalnya klien async)."""
+        return EntryWriter(self, key, max_bytes)
+
+    def touch(self, key, entry, ttl):
+        """Perpanjang masa berlaku entry setelah upstream menjawab 304 Not Modified."""
+        _, meta_path = self._paths(key)
+        entry.expires_at = time.time() + ttl
+        meta = asdict(entry)
+        meta.pop('path')
+        self._atomic_write(meta_path, json.dumps(meta).encode('utf-8'))
+        return entry
+
+    @contextmanager
+    def single_flight(self, key):
+        """
+        Hanya satu pemegang per key pada satu waktu: thread lain di proses ini
+        menunggu lewat threading.Lock, worker lain lewat flock pada <key>.lock.
+        Setelah masuk, pemanggil sebaiknya cek cache lagi karena pemegang
+        sebelumnya mungkin sudah mengisinya.
+        """
+        with self._lock:
+            flight = self._flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0]:
+                if fcntl is None:
+                    yield
+                    return
+                with open(self.lock_path(key), 'a') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            with self._lock:
+                flight[1] -= 1
+                if not flight[1]:
+                    del self._flights[key]
+
+    def _atomic_write(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _scan(self):
+        entries = []
+        for data_path in self.directory.glob('*/*.bin'):
+            try:
+                stat = data_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, data_path))
+        return entries
+
+    def _account(self, added, keep=None):
+        with self._lock:
+            if self._approx_size is None:
+                self._approx_size = sum(size for _, size, _ in self._scan())
+            else:
+                self._approx_size += added
+            if self._approx_size > self.max_bytes:
+                self._approx_size = self._evict(keep)
+
+    def _evict(self, keep=None):
+        # Hapus sampai 90% dari batas, supaya eviction tidak terjadi di setiap penulisan
+        entries = sorted(self._scan(), key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, data_path in entries:
+            if total <= target:
+                break
+            if data_path == keep:
+                # Entry yang baru ditulis akan langsung dibaca pemanggil
+                continue
+            for path in (data_path, data_path.with_suffix('.json')):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
+        return total
+
+
+class EntryWriter:
+    def __init__(self, cache, key, max_bytes=None):
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.data_path, self.meta_path = cache._paths(key)
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=self.data_path.parent, prefix='.tmp-')
+        self.file = os.fdopen(fd, 'wb')
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.max_bytes is not None and self.size > self.max_bytes:
+            raise ImageTooLarge(f'Image exceeds {self.max_bytes} bytes')
+        self.digest.update(chunk)
+        self.file.write(chunk)
+
+    def abort(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.unlink(self.tmp_path)
+
+    def commit(self, content_type, ttl, upstream_etag='', upstream_last_modified=''):
+        self.file.close()
+        os.replace(self.tmp_path, self.data_path)
+        entry = CachedImage(
+            content_type=content_type,
+            etag='"' + self.digest.hexdigest()[:32] + '"',
+            expires_at=time.time() + ttl,
+            upstream_etag=upstream_etag or '',
+            upstream_last_modified=upstream_last_modified or '',
+        )
+        meta = asdict(entry)
+        meta.pop('path')
+        self.cache._atomic_write(self.meta_path, json.dumps(meta).encode('utf-8'))
+        entry.path = str(self.data_path)
+        self.cache._account(self.size, keep=self.data_path)
+        return entry
+
+
+_cache = None
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = DiskImageCache(
+            getattr(settings, 'IMAGE_CACHE_DIR', Path(tempfile.gettempdir()) / 'gosport-image-cache'),
+            getattr(settings, 'IMAGE_CACHE_MAX_BYTES', 256 * 1024 * 1024),
+        )
+    return _cache
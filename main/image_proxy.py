@@ -0,0 +1,259 @@
+"""
+Pengambilan gambar eksternal untuk /proxy-image/ dengan cache di disk.
+
+Header Cache-Control/ETag/Last-Modified dari upstream dihormati: entry yang
+masih fresh langsung dilayani dari disk, entry yang kedaluwarsa divalidasi
+ulang dengan If-None-Match/If-Modified-Since. Untuk gambar yang di-cache, ke
+browser kita mengirim Cache-Control sendiri yang panjang plus ETag berbasis isi,
+jadi browser cukup revalidasi (304) tanpa mengunduh ulang. Gambar yang menurut
+upstream tidak boleh disimpan (no-store/private) dikirim dengan no-store.
+
+Upstream diambil lewat satu requests.Session bersama (koneksi keep-alive per
+host) dan body di-stream per chunk, baik ke file cache maupun ke client, dengan
+batas ukuran IMAGE_PROXY_MAX_BYTES.
+
+Host yang sering gagal diputus sementara oleh circuit breaker dan URL yang baru
+gagal diingat di negative cache (lihat main/circuit_breaker.py), jadi thumbnail
+rusak ditolak seketika alih-alih menunggu timeout.
+"""
+import re
+import threading
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from main.circuit_breaker import CircuitBreaker, NegativeCache
+from main.image_cache import ImageTooLarge, cache_key, get_cache
+
+DEFAULT_CONTENT_TYPE = 'image/jpeg'
+CHUNK_SIZE = 64 * 1024
+MAX_AGE_RE = re.compile(r'(?:^|,)\s*(?:s-)?max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+
+
+class UpstreamUnavailable(requests.RequestException):
+    """Upstream tidak dihubungi karena circuit terbuka atau URL ada di negative cache."""
+
+
+@dataclass
+class ImageResult:
+    content_type: str
+    etag: str
+    file: Optional[BinaryIO] = None
+    chunks: Optional[Iterator[bytes]] = None
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+breaker = CircuitBreaker(
+    threshold=setting('IMAGE_PROXY_BREAKER_THRESHOLD', 5),
+    reset_timeout=setting('IMAGE_PROXY_BREAKER_RESET_SECONDS', 30),
+)
+negative_cache = NegativeCache(ttl=setting('IMAGE_PROXY_NEGATIVE_TTL', 60))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=setting('IMAGE_PROXY_POOL_HOSTS', 16),
+                    pool_maxsize=setting('IMAGE_PROXY_POOL_SIZE', 10),
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def parse_cache_control(header):
+    """Kembalikan (boleh_disimpan, ttl_detik_atau_None) dari header Cache-Control upstream."""
+    header = (header or '').lower()
+    directives = {part.strip().split('=')[0] for part in header.split(',') if part.strip()}
+    if 'no-store' in directives or 'private' in directives:
+        return False, None
+    if 'no-cache' in directives:
+        return True, 0
+    match = MAX_AGE_RE.search(header)
+    return True, int(match.group(1)) if match else None
+
+
+def ttl_for(headers):
+    storable, ttl = parse_cache_control(headers.get('Cache-Control'))
+    if ttl is None:
+        ttl = setting('IMAGE_CACHE_DEFAULT_TTL', 24 * 60 * 60)
+    return storable, ttl
+
+
+def fetch_upstream(url, headers=None):
+    timeout = setting('IMAGE_PROXY_TIMEOUT', (3, 10))
+    return get_session().get(url, headers=headers or {}, timeout=timeout, stream=True)
+
+
+def record_error(host, url, error):
+    negative_cache.add(url, error)
+    response = getattr(error, 'response', None)
+    if response is not None and response.status_code < 500:
+        # 4xx berarti host sehat, hanya URL-nya yang salah
+        breaker.record_success(host)
+    else:
+        breaker.record_failure(host)
+
+
+def max_image_bytes():
+    return setting('IMAGE_PROXY_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def check_length(response):
+    try:
+        length = int(response.headers.get('Content-Length') or 0)
+    except ValueError:
+        length = 0
+    if length > max_image_bytes():
+        raise ImageTooLarge(f'Image exceeds {max_image_bytes()} bytes')
+
+
+def _stream_body(response):
+    """Teruskan body ke client tanpa cache, berhenti kalau melewati batas ukuran."""
+    size = 0
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_image_bytes():
+                break
+            yield chunk
+    finally:
+        response.close()
+
+
+def entry_result(entry):
+    return ImageResult(entry.content_type, entry.etag, file=entry.open())
+
+
+def get_image(url):
+    """
+    Ambil gambar dari cache atau upstream. Melempar requests.RequestException
+    kalau upstream gagal dan tidak ada salinan lama yang bisa dipakai, atau
+    ImageTooLarge kalau gambar melewati IMAGE_PROXY_MAX_BYTES.
+    """
+    cache = get_cache()
+    key = cache_key(url)
+    entry = cache.get(key)
+    if entry is not None and entry.is_fresh:
+        return entry_result(entry)
+
+    error = negative_cache.get(url)
+    if error is not None:
+        if entry is not None:
+            return entry_result(entry)
+        raise UpstreamUnavailable(error)
+
+    # Miss yang bersamaan untuk URL yang sama menunggu satu fetch upstream saja
+    with cache.single_flight(key):
+        entry = cache.get(key)
+        if entry is not None and entry.is_fresh:
+            return entry_result(entry)
+        return _fetch(cache, key, url, entry)
+
+
+def upstream_host(url):
+    """Host dari URL gambar; URL rusak (mis. "http://[::1") menjadi InvalidURL seperti di requests."""
+    try:
+        return urlsplit(url).hostname or ''
+    except ValueError as e:
+        raise requests.exceptions.InvalidURL(f'Invalid URL {url!r}: {e}')
+
+
+def _fetch(cache, key, url, entry):
+    conditional = {}
+    if entry is not None:
+        if entry.upstream_etag:
+            conditional['If-None-Match'] = entry.upstream_etag
+        if entry.upstream_last_modified:
+            conditional['If-Modified-Since'] = entry.upstream_last_modified
+
+    host = upstream_host(url)
+    if not breaker.allow(host):
+        if entry is not None:
+            return entry_result(entry)
+        raise UpstreamUnavailable(f'Image host {host} is temporarily unavailable')
+
+    try:
+        response = fetch_upstream(url, conditional)
+    except requests.RequestException as e:
+        record_error(host, url, e)
+        if entry is not None:
+            # Lebih baik gambar lama daripada gambar rusak
+            return entry_result(entry)
+        raise
+
+    try:
+        if entry is not None and response.status_code == 304:
+            breaker.record_success(host)
+            _, ttl = ttl_for(response.headers)
+            cache.touch(key, entry, ttl)
+            return entry_result(entry)
+        response.raise_for_status()
+        breaker.record_success(host)
+        check_length(response)
+
+        content_type = response.headers.get('Content-Type', DEFAULT_CONTENT_TYPE)
+        storable, ttl = ttl_for(response.headers)
+        if not storable:
+            # Body diteruskan apa adanya; response upstream ditutup oleh generator
+            result = ImageResult(content_type, '', chunks=_stream_body(response))
+            response = None
+            return result
+
+        entry = cache.set(
+            key, response.iter_content(CHUNK_SIZE), content_type, ttl,
+            upstream_etag=response.headers.get('ETag', ''),
+            upstream_last_modified=response.headers.get('Last-Modified', ''),
+            max_bytes=max_image_bytes(),
+        )
+        return entry_result(entry)
+    except requests.RequestException as e:
+        record_error(host, url, e)
+        if entry is not None:
+            return entry_result(entry)
+        raise
+    finally:
+        if response is not None:
+            response.close()
+
+
+def _etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    candidates = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return etag in candidates or '*' in candidates
+
+
+def build_response(request, image):
+    if image.etag and _etag_matches(request, image.etag):
+        if image.file is not None:
+            image.file.close()
+        response = HttpResponse(status=304)
+    elif image.file is not None:
+        response = FileResponse(image.file, content_type=image.content_type)
+    else:
+        response = StreamingHttpResponse(image.chunks, content_type=image.content_type)
+    if image.etag:
+        response['ETag'] = image.etag
+        patch_cache_control(
+            response, public=True,
+            max_age=setting('IMAGE_PROXY_BROWSER_MAX_AGE', 7 * 24 * 60 * 60),
+        )
+    else:
+        # Tanpa ETag berarti tidak disimpan di cache disk: ikuti larangan upstream sampai ke browser
+        patch_cache_control(response, no_store=True)
+    return response
@@ -0,0 +1,227 @@
+"""
+Versi async dari image proxy untuk deployment ASGI (lihat football_site/asgi.py).
+
+Logikanya sama dengan main/image_proxy.py (cache disk, revalidasi, circuit
+breaker, negative cache, batas ukuran) tetapi fetch upstream memakai
+httpx.AsyncClient, sehingga satu worker bisa menahan ratusan fetch yang sedang
+menunggu jaringan tanpa memblokir request katalog dan cart. Jumlah fetch
+bersamaan dibatasi IMAGE_PROXY_ASYNC_CONCURRENCY. I/O cache disk (baca entry,
+tulis, commit dan eviction) dijalankan di thread lewat asyncio.to_thread supaya
+event loop tidak ikut menunggu disk.
+
+httpx bersifat opsional; tanpa httpx, HTTPX_AVAILABLE bernilai False dan view
+async memakai implementasi sync di thread.
+"""
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from main.image_cache import cache_key, fcntl, get_cache
+from main.image_proxy import (
+    CHUNK_SIZE, DEFAULT_CONTENT_TYPE, ImageResult, UpstreamUnavailable,
+    check_length, entry_result, max_image_bytes, record_error, setting, ttl_for,
+    breaker, negative_cache, upstream_host,
+)
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+    FETCH_ERRORS = (httpx.HTTPError,)
+except ImportError:  # pragma: no cover - httpx tidak terpasang
+    httpx = None
+    HTTPX_AVAILABLE = False
+    FETCH_ERRORS = ()
+
+LOCK_POLL_SECONDS = 0.05
+
+
+def make_client():
+    connect, read = setting('IMAGE_PROXY_TIMEOUT', (3, 10))
+    concurrency = setting('IMAGE_PROXY_ASYNC_CONCURRENCY', 200)
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        timeout=httpx.Timeout(read, connect=connect),
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=setting('IMAGE_PROXY_POOL_SIZE', 10)),
+    )
+
+
+class _LoopState:
+    """Client, semaphore dan lock single-flight terikat ke satu event loop."""
+
+    def __init__(self):
+        self.client = make_client()
+        self.semaphore = asyncio.Semaphore(setting('IMAGE_PROXY_ASYNC_CONCURRENCY', 200))
+        self.flights = {}  # key -> [asyncio.Lock, jumlah coroutine yang menunggu]
+
+
+_states = weakref.WeakKeyDictionary()
+
+
+def _state():
+    loop = asyncio.get_running_loop()
+    state = _states.get(loop)
+    if state is None:
+        state = _states[loop] = _LoopState()
+    return state
+
+
+@asynccontextmanager
+async def _single_flight(state, cache, key):
+    # Koalesensi dalam proses lewat asyncio.Lock, antar worker lewat flock non-blocking yang di-poll
+    flight = state.flights.setdefault(key, [asyncio.Lock(), 0])
+    flight[1] += 1
+    try:
+        async with flight[0]:
+            if fcntl is None:
+                yield
+                return
+            lock_file = await asyncio.to_thread(_open_lock, cache, key)
+            with lock_file:
+                while True:
+                    try:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        await asyncio.sleep(LOCK_POLL_SECONDS)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    finally:
+        flight[1] -= 1
+        if not flight[1]:
+            del state.flights[key]
+
+
+def _open_lock(cache, key):
+    return open(cache.lock_path(key), 'a')
+
+
+class _StreamBody:
+    """
+    Body upstream no-store yang diteruskan tanpa cache. Berbeda dengan async
+    generator, aclose() tetap menutup response walau body belum pernah dibaca.
+    """
+
+    def __init__(self, response):
+        self.response = response
+        self.chunks = response.aiter_bytes(CHUNK_SIZE)
+        self.size = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = await self.chunks.__anext__()
+        except BaseException:
+            # Termasuk StopAsyncIteration: body habis, response ditutup
+            await self.aclose()
+            raise
+        self.size += len(chunk)
+        if self.size > max_image_bytes():
+            await self.aclose()
+            raise StopAsyncIteration
+        return chunk
+
+    async def aclose(self):
+        await self.response.aclose()
+
+
+async def read_body(image):
+    """
+    Baca body stream async menjadi ImageResult dengan chunk biasa supaya bisa
+    diproses kode sync (mis. thumbnail) tanpa fetch ulang ke upstream.
+    """
+    if image.chunks is None or not hasattr(image.chunks, 'aclose'):
+        return image
+    try:
+        data = b''.join([chunk async for chunk in image.chunks])
+    finally:
+        await image.chunks.aclose()
+    return ImageResult(image.content_type, image.etag, chunks=iter([data]))
+
+
+async def _entry_result(entry):
+    return await asyncio.to_thread(entry_result, entry)
+
+
+async def get_image_async(url):
+    """Padanan async dari image_proxy.get_image."""
+    cache = get_cache()
+    key = cache_key(url)
+    entry = await asyncio.to_thread(cache.get, key)
+    if entry is not None and entry.is_fresh:
+        return await _entry_result(entry)
+
+    error = negative_cache.get(url)
+    if error is not None:
+        if entry is not None:
+            return await _entry_result(entry)
+        raise UpstreamUnavailable(error)
+
+    state = _state()
+    async with _single_flight(state, cache, key):
+        entry = await asyncio.to_thread(cache.get, key)
+        if entry is not None and entry.is_fresh:
+            return await _entry_result(entry)
+        async with state.semaphore:
+            return await _fetch(state, cache, key, url, entry)
+
+
+async def _fetch(state, cache, key, url, entry):
+    conditional = {}
+    if entry is not None:
+        if entry.upstream_etag:
+            conditional['If-None-Match'] = entry.upstream_etag
+        if entry.upstream_last_modified:
+            conditional['If-Modified-Since'] = entry.upstream_last_modified
+
+    host = upstream_host(url)
+    if not breaker.allow(host):
+        if entry is not None:
+            return await _entry_result(entry)
+        raise UpstreamUnavailable(f'Image host {host} is temporarily unavailable')
+
+    response = None
+    try:
+        response = await state.client.send(
+            state.client.build_request('GET', url, headers=conditional), stream=True,
+        )
+        if entry is not None and response.status_code == 304:
+            breaker.record_success(host)
+            _, ttl = ttl_for(response.headers)
+            await asyncio.to_thread(cache.touch, key, entry, ttl)
+            return await _entry_result(entry)
+        response.raise_for_status()
+        breaker.record_success(host)
+        check_length(response)
+
+        content_type = response.headers.get('Content-Type', DEFAULT_CONTENT_TYPE)
+        storable, ttl = ttl_for(response.headers)
+        if not storable:
+            # Response upstream ditutup oleh _StreamBody setelah body terkirim atau dibuang
+            result = ImageResult(content_type, '', chunks=_StreamBody(response))
+            response = None
+            return result
+
+        writer = await asyncio.to_thread(cache.open_writer, key, max_image_bytes())
+        try:
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                await asyncio.to_thread(writer.write, chunk)
+        except BaseException:
+            await asyncio.to_thread(writer.abort)
+            raise
+        entry = await asyncio.to_thread(
+            writer.commit, content_type, ttl,
+            upstream_etag=response.headers.get('ETag', ''),
+            upstream_last_modified=response.headers.get('Last-Modified', ''),
+        )
+        return await _entry_result(entry)
+    except FETCH_ERRORS as e:
+        record_error(host, url, e)
+        if entry is not None:
+            return await _entry_result(entry)
+        raise
+    finally:
+        if response is not None:
+            await response.aclose()
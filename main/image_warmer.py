@@ -0,0 +1,114 @@
+"""
+Pengisian awal cache gambar /proxy-image/ (dipakai command warm_image_cache).
+
+Setiap URL diambil lewat image_proxy.get_image dan thumbnails.get_thumbnail,
+jadi hasilnya persis entry yang nanti dipakai view. Fetch berjalan paralel di
+thread pool, dengan rate limit global supaya host gambar tidak dibanjiri.
+"""
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from main.image_cache import cache_key, get_cache
+from main.image_proxy import get_image
+from main.models import Product
+from main.thumbnails import Image, get_thumbnail, parse_variant
+
+# Fallback di generateThumbnailHTML (main.html), dipakai setiap kartu tanpa thumbnail
+DEFAULT_THUMBNAIL_URL = "https://images.unsplash.com/photo-1461896836934-ffe607ba8211?w=400&h=300&fit=crop"
+# Lebar srcset di generateThumbnailHTML
+DEFAULT_WIDTHS = (320, 480, 640, 960)
+
+HIT = 'hit'
+MISS = 'miss'
+FAILED = 'failed'
+
+
+class RateLimiter:
+    """Paling banyak `per_second` izin per detik, dibagi rata ke semua thread."""
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def product_thumbnail_urls():
+    urls = (
+        Product.objects.exclude(thumbnail__isnull=True).exclude(thumbnail='')
+        .values_list('thumbnail', flat=True).distinct()
+    )
+    return list(urls.iterator(chunk_size=2000))
+
+
+def _close(image):
+    if image.file is not None:
+        image.file.close()
+    elif image.chunks is not None:
+        for _ in image.chunks:
+            pass
+
+
+def warm_url(url, variants, limiter):
+    """
+    Hangatkan satu URL beserta variannya. Mengembalikan Counter hit/miss/failed;
+    setiap URL dan varian dihitung tepat satu kali.
+    """
+    stats = Counter()
+    cache = get_cache()
+    entry = cache.get(cache_key(url))
+    fresh = entry is not None and entry.is_fresh
+    try:
+        if not fresh:
+            limiter.wait()
+        original = get_image(url)
+    except Exception:
+        stats[FAILED] += 1
+        return stats
+    stats[HIT if fresh else MISS] += 1
+    etag = original.etag
+    _close(original)
+
+    if Image is None:
+        return stats
+    for variant in variants:
+        width, height, fmt = variant
+        if etag and cache.get(cache_key(etag, f'{width}x{height}.{fmt}')) is not None:
+            stats[HIT] += 1
+            continue
+        try:
+            _close(get_thumbnail(url, *variant))
+            stats[MISS] += 1
+        except Exception:
+            stats[FAILED] += 1
+    return stats
+
+
+def warm_image_cache(urls, widths=DEFAULT_WIDTHS, fmt='webp', workers=8, rate=10.0, progress=None):
+    """
+    Prefetch semua URL (dan varian lebar `widths`) ke cache disk.
+    `progress(url, stats)` dipanggil setelah setiap URL selesai.
+    """
+    variants = sorted({parse_variant({'w': str(width), 'fmt': fmt}) for width in widths})
+    limiter = RateLimiter(rate)
+    totals = Counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {url: executor.submit(warm_url, url, variants, limiter) for url in dict.fromkeys(urls)}
+        for url, future in futures.items():
+            stats = future.result()
+            totals.update(stats)
+            if progress:
+                progress(url, stats)
+    for key in (HIT, MISS, FAILED):
+        totals.setdefault(key, 0)
+    return totals
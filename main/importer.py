@@ -0,0 +1,122 @@
+"""
+Import produk dari database products_data ke Product (command import_products).
+
+Baris dikelompokkan per nama produk di SQL (GROUP BY + COUNT untuk stok), lalu
+dibaca bertahap lewat iterator (fetchmany) dan di-upsert per batch dengan
+bulk_create(update_conflicts=True) pada Product.import_key. Import bisa
+diulang kapan saja tanpa menggandakan produk, dan memori yang dipakai hanya
+sebesar satu batch.
+"""
+import hashlib
+import time
+from dataclasses import dataclass
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+from main import autocomplete, facets, product_cache, search
+from main.categories import classify_many
+from main.models import Product, ProductsData
+from main.sync import EXTERNAL_DB, iter_batches
+
+IMPORT_SOURCE = 'products_data'
+DEFAULT_BATCH_SIZE = 1000
+UPDATE_FIELDS = ['seller', 'old_price', 'special_price', 'discount_percent', 'category', 'description', 'stock', 'updated_at']
+
+
+def import_key(product_name, source=IMPORT_SOURCE):
+    return hashlib.sha256(f'{source}:{product_name}'.encode('utf-8')).hexdigest()
+
+
+def refresh_derived_indexes():
+    """
+    Upsert massal tidak mengirim signal dan tidak tahu baris mana yang baru,
+    jadi facet, index search, autocomplete dan cache produk diperbarui sekali di akhir.
+    """
+    facets.rebuild_facets(include_external=False)
+    search.get_backend().rebuild()
+    autocomplete.index.reset()
+    product_cache.invalidate_all()
+
+
+@dataclass
+class ImportResult:
+    groups: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rate(self):
+        return self.groups / self.elapsed if self.elapsed else 0.0
+
+
+def _adopt_legacy(seller, keys_by_name):
+    """Beri import_key ke produk hasil import lama (sebelum ada import_key) supaya ikut di-upsert."""
+    legacy = (
+        Product.objects.filter(seller=seller, import_key__isnull=True, product_name__in=keys_by_name)
+        .order_by('created_at', 'id')
+    )
+    adopted = {}
+    for product in legacy:
+        if product.product_name not in adopted:
+            product.import_key = keys_by_name[product.product_name]
+            adopted[product.product_name] = product
+    if adopted:
+        Product.objects.bulk_update(adopted.values(), ['import_key'])
+
+
+def import_products_data(seller, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    if EXTERNAL_DB not in settings.DATABASES:
+        # Di PRODUCTION hanya ada database default
+        raise ImproperlyConfigured(f"Database '{EXTERNAL_DB}' is not configured, nothing to import.")
+    started = time.monotonic()
+    result = ImportResult()
+
+    groups = (
+        ProductsData.objects.using(EXTERNAL_DB)
+        .values('product_name')
+        .annotate(stock=Count('data_id'), first_id=Min('data_id'))
+        .order_by('first_id')
+        .values_list('product_name', 'stock', 'first_id')
+    )
+    for batch in iter_batches(groups.iterator(chunk_size=batch_size), batch_size):
+        # Harga dan label diambil dari baris pertama setiap grup
+        first_rows = ProductsData.objects.using(EXTERNAL_DB).in_bulk([first_id for _, _, first_id in batch])
+        now = timezone.now()
+        # Nama produk + label "Product" dari feed, misalnya "Nivia Volleyball" + "Ball"
+        labels = classify_many(f'{name} {first_rows[first_id].product or ""}' for name, _, first_id in batch)
+        products = []
+        for (name, stock, first_id), category in zip(batch, labels):
+            row = first_rows[first_id]
+            name = name or "Unnamed Product"
+            products.append(Product(
+                seller=seller,
+                product_name=name,
+                old_price=row.old_price or 0,
+                special_price=row.special_price or 0,
+                discount_percent=int(round(row.discount_field)) if row.discount_field else 0,
+                category=category,
+                description=f"Category: {row.product}. {name} is a high-quality product.",
+                stock=stock,
+                import_key=import_key(name),
+                updated_at=now,
+            ))
+
+        with transaction.atomic():
+            _adopt_legacy(seller, {p.product_name: p.import_key for p in products})
+            Product.objects.bulk_create(
+                products, batch_size=batch_size,
+                update_conflicts=True, unique_fields=['import_key'], update_fields=UPDATE_FIELDS,
+            )
+
+        result.groups += len(batch)
+        result.batches += 1
+        result.elapsed = time.monotonic() - started
+        if progress:
+            progress(result)
+
+    refresh_derived_indexes()
+
+    result.elapsed = time.monotonic() - started
+    return result
@@ -0,0 +1,290 @@
+"""
+Ingest feed supplier (CSV/JSONL) ke Product secara paralel (command ingest_catalog).
+
+File dipotong menjadi rentang byte yang sejajar dengan batas baris, lalu setiap
+rentang di-parse, divalidasi dan dinormalisasi (harga, diskon, kategori) di
+ProcessPoolExecutor. Proses utama menjadi satu-satunya writer: hasil dari worker
+digabung dan di-upsert per batch pada Product.import_key, sama seperti
+import_products. Karena pemotongan per baris, setiap record harus berada dalam
+satu baris (CSV tanpa newline di dalam field yang di-quote).
+"""
+import csv
+import io
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.utils import timezone
+from main.categories import classify
+from main.importer import import_key, refresh_derived_indexes
+from main.models import Product, discount_for
+
+DEFAULT_CHUNK_BYTES = 4 * 1024 * 1024
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+UPDATE_FIELDS = [
+    'seller', 'old_price', 'special_price', 'discount_percent', 'category',
+    'description', 'thumbnail', 'stock', 'updated_at',
+]
+CATEGORIES = {key for key, _ in Product.CATEGORY_CHOICES}
+FIELD_ALIASES = {
+    'name': 'product_name',
+    'price': 'old_price',
+    'sale_price': 'special_price',
+    'image': 'thumbnail',
+    'image_url': 'thumbnail',
+    'quantity': 'stock',
+}
+PRICE_CLEAN_RE = re.compile(r'[^\d.,\-]')
+_price_field = Product._meta.get_field('old_price')
+MAX_PRICE = Decimal(10) ** (_price_field.max_digits - _price_field.decimal_places)
+MAX_STOCK = 2147483647
+MAX_LENGTHS = {name: Product._meta.get_field(name).max_length for name in ('product_name', 'thumbnail')}
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+# ========== PARSING (berjalan di worker) ==========
+
+def _checked_price(value, raw):
+    # NaN/Infinity (json.loads menerimanya) dan harga yang melebihi max_digits kolom harga
+    # harus gagal per baris, bukan menggagalkan seluruh batch upsert
+    try:
+        price = value.quantize(Decimal('0.01')) if value.is_finite() else None
+    except InvalidOperation:
+        price = None
+    if price is None or price < 0 or price >= MAX_PRICE:
+        raise InvalidRow(f'invalid price {raw!r}')
+    return price
+
+
+def parse_price(value):
+    """
+    Terima angka atau string seperti "Rp 1.250.000", "1,250.50", "$12.99".
+    Pemisah terakhir dianggap desimal kalau diikuti 1-2 digit, selain itu pemisah ribuan.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise InvalidRow(f'invalid price {value!r}')
+    if isinstance(value, (int, float)):
+        try:
+            price = Decimal(str(value))
+        except InvalidOperation:
+            raise InvalidRow(f'invalid price {value!r}')
+        return _checked_price(price, value)
+    text = PRICE_CLEAN_RE.sub('', str(value))
+    if not text or text.startswith('-'):
+        raise InvalidRow(f'invalid price {value!r}')
+
+    last_sep = max(text.rfind('.'), text.rfind(','))
+    if last_sep != -1 and 1 <= len(text) - last_sep - 1 <= 2:
+        integer, fraction = text[:last_sep], text[last_sep + 1:]
+    else:
+        integer, fraction = text, '0'
+    integer = integer.replace('.', '').replace(',', '')
+    try:
+        price = Decimal(f'{integer or 0}.{fraction}')
+    except InvalidOperation:
+        raise InvalidRow(f'invalid price {value!r}')
+    return _checked_price(price, value)
+
+
+def _normalize_keys(record):
+    normalized = {}
+    for key, value in record.items():
+        key = str(key).strip().lower().replace(' ', '_')
+        normalized[FIELD_ALIASES.get(key, key)] = value.strip() if isinstance(value, str) else value
+    return normalized
+
+
+def parse_stock(value):
+    if isinstance(value, bool):
+        raise InvalidRow(f'invalid stock {value!r}')
+    if isinstance(value, float) and not value.is_integer():
+        # Termasuk NaN/Infinity dari json.loads
+        raise InvalidRow(f'invalid stock {value!r}')
+    try:
+        stock = int(value or 0)
+    except (TypeError, ValueError):
+        raise InvalidRow(f'invalid stock {value!r}')
+    if stock < 0:
+        raise InvalidRow('negative stock')
+    if stock > MAX_STOCK:
+        raise InvalidRow('stock out of range')
+    return stock
+
+
+def _check_length(name, value):
+    # Satu nilai yang terlalu panjang menggagalkan seluruh bulk_create di PostgreSQL (DataError)
+    if len(value) > MAX_LENGTHS[name]:
+        raise InvalidRow(f'{name} longer than {MAX_LENGTHS[name]} characters')
+    return value
+
+
+def normalize_record(record):
+    """Validasi satu record mentah dan kembalikan dict siap-upsert. Melempar InvalidRow."""
+    record = _normalize_keys(record)
+    name = record.get('product_name')
+    if not name:
+        raise InvalidRow('missing product_name')
+    name = _check_length('product_name', str(name))
+
+    old_price = parse_price(record.get('old_price'))
+    special_price = parse_price(record.get('special_price'))
+    if old_price is None and special_price is None:
+        raise InvalidRow('missing price')
+    old_price = old_price if old_price is not None else special_price
+    special_price = special_price if special_price is not None else old_price
+    if special_price > old_price:
+        raise InvalidRow('special_price is higher than old_price')
+
+    stock = parse_stock(record.get('stock'))
+
+    category = str(record.get('category') or '').strip().lower()
+    if category not in CATEGORIES:
+        category = classify(name)
+
+    return {
+        'product_name': name,
+        'old_price': old_price,
+        'special_price': special_price,
+        'discount_percent': discount_for(old_price, special_price) if old_price > 0 else 0,
+        'category': category,
+        'description': record.get('description') or '',
+        'thumbnail': _check_length('thumbnail', str(record.get('thumbnail') or '')),
+        'stock': stock,
+    }
+
+
+def _read_lines(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return data.decode('utf-8-sig' if start == 0 else 'utf-8').splitlines()
+
+
+def parse_chunk(path, start, end, fieldnames=None):
+    """Parse satu rentang byte. Mengembalikan (records, errors) yang bisa di-pickle."""
+    lines = _read_lines(path, start, end)
+    if fieldnames is None:
+        raw_records = (line for line in lines if line.strip())
+    else:
+        raw_records = csv.DictReader(lines[1:] if start == 0 else lines, fieldnames=fieldnames)
+
+    records, errors = [], []
+    for number, raw in enumerate(raw_records):
+        try:
+            record = json.loads(raw) if fieldnames is None else raw
+            if not isinstance(record, dict):
+                raise InvalidRow('record is not an object')
+            records.append(normalize_record(record))
+        except ValueError as e:
+            errors.append(f'{os.path.basename(path)}@{start}+{number}: {e}')
+    return records, errors
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+# ========== PEMBAGIAN FILE ==========
+
+def split_file(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """Potong file menjadi (path, start, end, fieldnames) yang setiap batasnya jatuh di awal baris."""
+    size = os.path.getsize(path)
+    fieldnames = None
+    if not path.lower().endswith(('.jsonl', '.ndjson')):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            fieldnames = next(csv.reader(io.StringIO(f.readline())), None) or []
+
+    chunks = []
+    with open(path, 'rb') as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            f.readline()
+            end = min(f.tell(), size)
+            chunks.append((path, start, end, fieldnames))
+            start = end
+    return chunks
+
+
+# ========== WRITER (proses utama) ==========
+
+@dataclass
+class IngestResult:
+    rows: int = 0
+    upserted: int = 0
+    invalid: int = 0
+    errors: list = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+def _write_batch(records, seller, source):
+    now = timezone.now()
+    # Nama yang sama dalam satu statement upsert tidak diizinkan (PostgreSQL), yang terakhir menang
+    unique = {record['product_name']: record for record in records}
+    products = [
+        Product(seller=seller, import_key=import_key(name, source), updated_at=now, **record)
+        for name, record in unique.items()
+    ]
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products, update_conflicts=True, unique_fields=['import_key'], update_fields=UPDATE_FIELDS,
+        )
+    return len(products)
+
+
+def ingest_files(paths, seller, source='feed', workers=None, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                 batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    started = time.monotonic()
+    result = IngestResult()
+    chunks = [chunk for path in paths for chunk in split_file(path, chunk_bytes)]
+    pending_records = []
+
+    def collect(records, errors):
+        result.rows += len(records) + len(errors)
+        result.invalid += len(errors)
+        result.errors.extend(errors[:MAX_REPORTED_ERRORS - len(result.errors)])
+        pending_records.extend(records)
+        while len(pending_records) >= batch_size:
+            result.upserted += _write_batch(pending_records[:batch_size], seller, source)
+            del pending_records[:batch_size]
+        if progress:
+            result.elapsed = time.monotonic() - started
+            progress(result)
+
+    if workers == 0:
+        for chunk in chunks:
+            collect(*parse_chunk(*chunk))
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            # Jumlah chunk yang sedang diproses dibatasi supaya memori writer tetap terkendali
+            remaining = iter(chunks)
+            running = set()
+            while True:
+                while len(running) < workers * 2:
+                    chunk = next(remaining, None)
+                    if chunk is None:
+                        break
+                    running.add(executor.submit(parse_chunk, *chunk))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(*future.result())
+
+    if pending_records:
+        result.upserted += _write_batch(pending_records, seller, source)
+    refresh_derived_indexes()
+    result.elapsed = time.monotonic() - started
+    return result
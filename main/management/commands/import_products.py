@@ -0,0 +1,38 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand
+from main.importer import DEFAULT_BATCH_SIZE, import_products_data
+
+# --- Configuration ---
+FIXED_SELLER_USERNAME = 'gosport_admin'
+
+
+class Command(BaseCommand):
+    help = 'Upserts products_data rows into Product, one product per name with stock = number of rows. Safe to rerun.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--seller', default=FIXED_SELLER_USERNAME, help='Username that owns the imported products.')
+
+    def handle(self, *args, **options):
+        try:
+            seller_user = User.objects.get(username=options['seller'])
+        except User.DoesNotExist:
+            self.stdout.write(self.style.ERROR(
+                f"Seller user '{options['seller']}' not found. Please create this user first."
+            ))
+            return
+
+        def progress(result):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {result.groups} products upserted ({result.rate:.0f}/s)')
+
+        try:
+            result = import_products_data(seller_user, batch_size=options['batch_size'], progress=progress)
+        except ImproperlyConfigured as e:
+            self.stdout.write(self.style.ERROR(str(e)))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Upserted {result.groups} products in {result.batches} batches '
+            f'({result.elapsed:.1f}s, {result.rate:.0f} products/s).'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from main.facets import rebuild_facets
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the category facet counts for internal products and the external products_data rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--internal-only', action='store_true', help='Skip recounting the external database.')
+
+    def handle(self, *args, **options):
+        rebuild_facets(include_external=not options['internal_only'])
+        self.stdout.write(self.style.SUCCESS('Category facets rebuilt.'))
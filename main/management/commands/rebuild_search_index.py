@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from main.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the product full-text search index (no-op for the PostgreSQL expression index).'
+
+    def handle(self, *args, **options):
+        get_backend().rebuild()
+        self.stdout.write(self.style.SUCCESS('Product search index rebuilt.'))
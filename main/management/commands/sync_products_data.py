@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from main.sync import DEFAULT_BATCH_SIZE, sync_products_data
+
+
+class Command(BaseCommand):
+    help = 'Imports new rows from the products_data database into Product, starting after the stored ROWID watermark.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Ignore the watermark and rescan every external row (existing names are still skipped).'
+        )
+
+    def handle(self, *args, **options):
+        created = sync_products_data(batch_size=options['batch_size'], full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f'Synced products_data: {created} new products created.'))
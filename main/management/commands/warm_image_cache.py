@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from main.image_warmer import DEFAULT_THUMBNAIL_URL, DEFAULT_WIDTHS, FAILED, HIT, MISS, product_thumbnail_urls, warm_image_cache
+
+
+class Command(BaseCommand):
+    help = 'Prefetches Product.thumbnail images and their resized variants into the /proxy-image/ disk cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent fetches.')
+        parser.add_argument('--rate', type=float, default=10.0, help='Maximum upstream fetches per second (0 = unlimited).')
+        parser.add_argument(
+            '--widths', type=lambda value: [int(w) for w in value.split(',') if w],
+            default=list(DEFAULT_WIDTHS), help='Comma-separated thumbnail widths to render (empty = originals only).'
+        )
+        parser.add_argument('--fmt', default='webp', choices=['webp', 'jpeg'])
+        parser.add_argument('--url', action='append', default=[], help='Extra image URL to warm (repeatable).')
+
+    def handle(self, *args, **options):
+        urls = product_thumbnail_urls() + [DEFAULT_THUMBNAIL_URL] + options['url']
+        self.stdout.write(f'Warming {len(set(urls))} image URLs...')
+
+        def progress(url, stats):
+            if stats[FAILED] and options['verbosity'] > 1:
+                self.stderr.write(f'Failed: {url}')
+
+        started = time.monotonic()
+        totals = warm_image_cache(
+            urls, widths=options['widths'], fmt=options['fmt'],
+            workers=options['workers'], rate=options['rate'], progress=progress,
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Image cache warmed in {elapsed:.1f}s: {totals[HIT]} hits, {totals[MISS]} misses, {totals[FAILED]} failures.'
+        ))
@@ -0,0 +1,31 @@
+from collections import Counter
+from django.db import migrations
+from django.db.models import Count
+
+
+def populate_internal_facets(apps, schema_editor):
+    Product = apps.get_model('main', 'Product')
+    CategoryFacet = apps.get_model('main', 'CategoryFacet')
+
+    counts = Counter()
+    for row in Product.objects.values('category').annotate(total=Count('id')):
+        category = (row['category'] or '').strip().lower()
+        if category:
+            counts[category] += row['total']
+
+    CategoryFacet.objects.filter(source='internal').delete()
+    CategoryFacet.objects.bulk_create([
+        CategoryFacet(source='internal', category=category, count=total)
+        for category, total in counts.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0006_categoryfacet'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_internal_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Salinan ekspresi main.search.PG_DOCUMENT pada saat migration ini dibuat
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(product_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS main_product_fts USING fts5("
+            "product_id UNINDEXED, product_name, description, category, tokenize='unicode61')"
+        )
+        schema_editor.execute(
+            "INSERT INTO main_product_fts (product_id, product_name, description, category) "
+            "SELECT id, product_name, coalesce(description, ''), category FROM main_product"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS product_search_gin ON main_product USING GIN (({PG_DOCUMENT}))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS main_product_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS product_search_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0007_populate_category_facets'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,31 @@
+import uuid
+from django.db import migrations
+
+
+def key_fts_rows_by_rowid(apps, schema_editor):
+    # Isi ulang main_product_fts dengan rowid = 63 bit teratas UUID produk (lihat main.search.fts_rowid)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    Product = apps.get_model('main', 'Product')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DELETE FROM main_product_fts")
+        rows = [
+            (uuid.UUID(str(pk)).int >> 65, uuid.UUID(str(pk)).hex, name or '', description or '', category or '')
+            for pk, name, description, category in Product.objects.values_list('id', 'product_name', 'description', 'category').iterator()
+        ]
+        cursor.executemany(
+            "INSERT INTO main_product_fts (rowid, product_id, product_name, description, category) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            rows,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0009_product_import_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(key_fts_rows_by_rowid, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,13 @@
 import uuid
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower
 from django.contrib.auth.models import User
 
+def discount_for(old_price, special_price):
+    """Persentase diskon dari harga lama ke harga spesial (dipakai juga oleh pipeline ingest)."""
+    return round((1 - (special_price / old_price)) * 100)
+
 class Profile(models.Model):
     ROLE_CHOICES = [
         ('buyer', 'Buyer'),
@@ -40,6 +46,19 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     avg_rating = models.FloatField(default=0.0)
+    # Key stabil untuk produk hasil import_products (upsert idempotent); NULL untuk produk buatan seller
+    import_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False, serialize=False)
+
+    class Meta:
+        indexes = [
+            # Index untuk keyset pagination (sort key + id sebagai tie-breaker)
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            models.Index(fields=['special_price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['product_name', 'id'], name='product_name_id_idx'),
+            # Index untuk filter server-side di /json/ (category, seller=me)
+            models.Index(Lower('category'), F('created_at'), F('id'), name='product_category_lower_idx'),
+            models.Index(fields=['seller', 'created_at', 'id'], name='product_seller_created_idx'),
+        ]
 
     def __str__(self):
         return self.product_name
@@ -50,9 +69,7 @@ class Product(models.Model):
 
     def calculate_discount(self):
         if self.old_price > 0:
-            self.discount_percent = round(
-                (1 - (self.special_price / self.old_price)) * 100
-            )
+            self.discount_percent = discount_for(self.old_price, self.special_price)
             self.save()
         return self.discount_percent
 
@@ -71,4 +88,29 @@ class ProductsData(models.Model):
         ordering = ['data_id'] 
 
     def __str__(self):
-        return self.product_name or "Unnamed Product Data"
\ No newline at end of file
+        return self.product_name or "Unnamed Product Data"
+
+class SyncState(models.Model):
+    """Watermark sinkronisasi dari database eksternal (ROWID terakhir yang sudah diimpor)."""
+    source = models.CharField(max_length=100, unique=True)
+    last_rowid = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.last_rowid}"
+
+class CategoryFacet(models.Model):
+    """Jumlah produk per kategori, dijaga inkremental oleh main.facets."""
+    SOURCE_CHOICES = [
+        ('internal', 'Internal'),
+        ('external', 'External'),
+    ]
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    category = models.CharField(max_length=50)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('source', 'category')
+
+    def __str__(self):
+        return f"{self.source}:{self.category} ({self.count})"
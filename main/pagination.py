@@ -0,0 +1,104 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+import uuid
+from django.conf import settings
+from django.db.models import Q
+
+# Sort key -> (field, descending). Setiap sort key selalu memakai id sebagai tie-breaker.
+SORT_KEYS = {
+    'created_at': ('created_at', False),
+    '-created_at': ('created_at', True),
+    'special_price': ('special_price', False),
+    '-special_price': ('special_price', True),
+    'product_name': ('product_name', False),
+    '-product_name': ('product_name', True),
+}
+DEFAULT_SORT = 'created_at'
+SORT_FIELDS = tuple(dict.fromkeys(field for field, _ in SORT_KEYS.values()))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def get_page_size(raw):
+    default = getattr(settings, 'PRODUCT_PAGE_SIZE', 24)
+    maximum = getattr(settings, 'PRODUCT_PAGE_SIZE_MAX', 100)
+    try:
+        size = int(raw) if raw else default
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+def _dump_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _load_value(field, raw):
+    if field == 'created_at':
+        return datetime.datetime.fromisoformat(raw)
+    if field == 'special_price':
+        return decimal.Decimal(raw)
+    return raw
+
+
+def _get(item, name):
+    # Item bisa berupa model instance atau dict dari values()
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+def encode_cursor(sort, item):
+    field, _ = SORT_KEYS[sort]
+    payload = [sort, _dump_value(_get(item, field)), str(_get(item, 'id'))]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Kembalikan (sort, value, id) dari cursor opaque, atau raise InvalidCursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort, raw_value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        field, _ = SORT_KEYS[sort]
+        if not isinstance(raw_value, str):
+            raise InvalidCursor(cursor)
+        # Cursor bisa diubah client; id yang bukan UUID (atau null) tidak boleh sampai ke query
+        return sort, _load_value(field, raw_value), uuid.UUID(str(last_id))
+    except (binascii.Error, ValueError, TypeError, KeyError, decimal.InvalidOperation):
+        raise InvalidCursor(cursor)
+
+
+def paginate_keyset(queryset, sort=DEFAULT_SORT, cursor=None, page_size=None):
+    """
+    Ambil satu halaman dari queryset dengan keyset pagination.
+
+    Mengembalikan (items, next_cursor). next_cursor bernilai None di halaman terakhir.
+    Cursor menyimpan sort key-nya sendiri, jadi sort dari cursor menang atas parameter.
+    """
+    if cursor:
+        sort, value, last_id = decode_cursor(cursor)
+    if sort not in SORT_KEYS:
+        sort = DEFAULT_SORT
+    field, descending = SORT_KEYS[sort]
+
+    if cursor:
+        op = 'lt' if descending else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': last_id})
+        )
+
+    prefix = '-' if descending else ''
+    queryset = queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+
+    page_size = page_size or get_page_size(None)
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(sort, items[-1])
+    return items, next_cursor
@@ -0,0 +1,136 @@
+"""
+Cache pembacaan Product berdasarkan primary key.
+
+Dua lapis: LRU in-process per worker (PRODUCT_CACHE_SIZE entry) lalu cache
+framework Django (bersama antar worker kalau backend-nya Redis/Memcached).
+Setiap produk punya version stamp di cache Django yang diganti oleh signal
+save/delete; ditambah satu generation global untuk invalidasi massal (bulk
+upsert, edit profil seller). Entry lokal hanya dipakai kalau version-nya masih
+sama dan umurnya belum melewati PRODUCT_CACHE_LOCAL_TTL, jadi satu hit cukup
+satu get_many ke cache Django tanpa query database.
+
+Version stamp harus ada di cache yang dipakai bersama semua worker (lihat
+main/shared_cache.py); tanpa itu get_product langsung membaca database.
+Jalur tulis (harga di cart, avg_rating) tidak memakai modul ini, supaya salinan
+cache tidak pernah ditulis balik ke database.
+
+Produk disimpan bersama seller dan profile-nya (select_related) supaya
+show_json_by_id juga bisa dilayani dari cache. Pemanggil selalu menerima
+salinan, jadi aman untuk dimodifikasi.
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from main.models import Product
+from main.shared_cache import get_shared_cache, new_token, version_tokens
+
+GENERATION_KEY = 'product-cache:generation'
+
+
+def _version_key(pk):
+    return f'product-cache:version:{pk}'
+
+
+def _data_key(pk, version):
+    return f'product-cache:data:{pk}:{version}'
+
+
+class LocalLRU:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # pk -> (version, expires_at, product)
+
+    def get(self, pk, version):
+        with self._lock:
+            item = self._entries.get(pk)
+            if item is None or item[0] != version or item[1] <= time.monotonic():
+                return None
+            self._entries.move_to_end(pk)
+            return item[2]
+
+    def set(self, pk, version, product):
+        with self._lock:
+            self._entries[pk] = (version, time.monotonic() + self.ttl, product)
+            self._entries.move_to_end(pk)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, pk):
+        with self._lock:
+            self._entries.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local = LocalLRU(getattr(settings, 'PRODUCT_CACHE_SIZE', 2048), getattr(settings, 'PRODUCT_CACHE_LOCAL_TTL', 5))
+
+
+def _current_version(cache, pk):
+    stamps = version_tokens(cache, [GENERATION_KEY, _version_key(pk)])
+    return f'{stamps[GENERATION_KEY]}:{stamps[_version_key(pk)]}'
+
+
+def get_product(pk):
+    """Product dengan pk tersebut (plus seller dan profile). Melempar Product.DoesNotExist."""
+    try:
+        # Bentuk kanonik, supaya "ABC..." dan "abc..." memakai entry (dan invalidasi) yang sama
+        pk = str(uuid.UUID(str(pk)))
+    except ValueError:
+        # Biarkan ORM melempar error yang sama seperti tanpa cache
+        return Product.objects.get(pk=pk)
+    cache = get_shared_cache()
+    if cache is None:
+        return Product.objects.select_related('seller__profile').get(pk=pk)
+    version = _current_version(cache, pk)
+    product = local.get(pk, version)
+    if product is None:
+        product = cache.get(_data_key(pk, version))
+        if product is None:
+            product = Product.objects.select_related('seller__profile').get(pk=pk)
+            cache.set(_data_key(pk, version), product, getattr(settings, 'PRODUCT_CACHE_TTL', 300))
+        local.set(pk, version, product)
+    return copy.deepcopy(product)
+
+
+def get_product_or_404(pk):
+    try:
+        return get_product(pk)
+    except Product.DoesNotExist:
+        raise Http404('No Product matches the given query.')
+
+
+def invalidate(pk):
+    pk = str(pk)
+    cache = get_shared_cache()
+    if cache is None:
+        return
+
+    def bump():
+        cache.set(_version_key(pk), new_token(), timeout=None)
+        local.discard(pk)
+
+    bump()
+    # Diulang setelah commit supaya pembaca yang sempat memuat data lama di tengah transaksi tidak menang
+    transaction.on_commit(bump)
+
+
+def invalidate_all():
+    cache = get_shared_cache()
+    if cache is None:
+        return
+
+    def bump():
+        cache.set(GENERATION_KEY, new_token(), timeout=None)
+        local.clear()
+
+    bump()
+    transaction.on_commit(bump)
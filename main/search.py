@@ -0,0 +1,170 @@
+"""
+Full-text search produk.
+
+Backend dipilih lewat settings.PRODUCT_SEARCH_BACKEND:
+- 'sqlite_fts5': virtual table FTS5 (main_product_fts) yang dijaga lewat signal, ranking bm25.
+- 'postgres': GIN index di atas to_tsvector(...) pada main_product, ranking ts_rank.
+  Index ini berbasis ekspresi, jadi selalu sinkron tanpa perlu signal.
+- 'simple': fallback icontains untuk database lain.
+"""
+import re
+import uuid
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from main.models import Product
+
+FTS_TABLE = 'main_product_fts'
+
+# Harus sama persis dengan ekspresi di index product_search_gin (migration 0008)
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(product_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+# Bobot bm25 per kolom FTS5: product_id, product_name, description, category
+FTS_WEIGHTS = (0.0, 10.0, 2.0, 5.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _key(pk):
+    # SQLite menyimpan UUIDField sebagai hex 32 karakter tanpa tanda hubung
+    return uuid.UUID(str(pk)).hex
+
+
+def fts_rowid(pk):
+    """
+    Rowid baris FTS untuk satu produk: 63 bit teratas UUID-nya. Kolom product_id di FTS5
+    UNINDEXED, jadi update/hapus per produk harus lewat rowid supaya tidak memindai seluruh tabel.
+    """
+    return uuid.UUID(str(pk)).int >> 65
+
+
+def tokenize(query):
+    return TOKEN_RE.findall((query or '').lower())
+
+
+def _fts_row(pk, product_name, description, category):
+    return (fts_rowid(pk), _key(pk), product_name or '', description or '', category or '')
+
+
+REBUILD_CHUNK = 2000
+
+
+class SqliteFTSBackend:
+    def _insert(self, cursor, rows):
+        # REPLACE: rowid bisa sudah ada (index ulang produk yang sama)
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, product_id, product_name, description, category) '
+            'VALUES (%s, %s, %s, %s, %s)',
+            rows,
+        )
+
+    def index_products(self, products):
+        rows = [_fts_row(p.pk, p.product_name, p.description, p.category) for p in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            self._insert(cursor, rows)
+
+    def remove_product(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [fts_rowid(pk)])
+
+    def rebuild(self):
+        products = Product.objects.values_list('id', 'product_name', 'description', 'category')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            rows = []
+            for product in products.iterator(chunk_size=REBUILD_CHUNK):
+                rows.append(_fts_row(*product))
+                if len(rows) >= REBUILD_CHUNK:
+                    self._insert(cursor, rows)
+                    rows = []
+            if rows:
+                self._insert(cursor, rows)
+
+    def search(self, query, limit, offset):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Setiap token di-quote (aman dari sintaks FTS5) dan dicocokkan sebagai prefix
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT product_id, bm25({FTS_TABLE}, {weights}) AS rank FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s OFFSET %s',
+                [match, limit, offset],
+            )
+            # bm25 FTS5 bernilai negatif (makin kecil makin relevan), dibalik supaya makin besar makin relevan
+            return [(product_id, -rank) for product_id, rank in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    def index_products(self, products):
+        pass
+
+    def remove_product(self, pk):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit, offset):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        tsquery = ' & '.join(f'{token}:*' for token in tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id, ts_rank({PG_DOCUMENT}, to_tsquery(\'simple\', %s)) AS rank FROM main_product '
+                f'WHERE ({PG_DOCUMENT}) @@ to_tsquery(\'simple\', %s) '
+                f'ORDER BY rank DESC, id LIMIT %s OFFSET %s',
+                [tsquery, tsquery, limit, offset],
+            )
+            return cursor.fetchall()
+
+
+class SimpleSearchBackend:
+    def index_products(self, products):
+        pass
+
+    def remove_product(self, pk):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit, offset):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        queryset = Product.objects.all()
+        for token in tokens:
+            queryset = queryset.filter(
+                Q(product_name__icontains=token) | Q(description__icontains=token) | Q(category__icontains=token)
+            )
+        ids = queryset.order_by('product_name', 'id').values_list('id', flat=True)[offset:offset + limit]
+        return [(pk, 1.0) for pk in ids]
+
+
+BACKENDS = {
+    'sqlite_fts5': SqliteFTSBackend,
+    'postgres': PostgresSearchBackend,
+    'simple': SimpleSearchBackend,
+}
+
+
+def get_backend():
+    name = getattr(settings, 'PRODUCT_SEARCH_BACKEND', None)
+    if name is None:
+        name = {'sqlite': 'sqlite_fts5', 'postgresql': 'postgres'}.get(connection.vendor, 'simple')
+    return BACKENDS[name]()
+
+
+def search_products(query, limit, offset=0):
+    """Kembalikan list (product_id, rank) terurut dari yang paling relevan."""
+    return get_backend().search(query, limit, offset)
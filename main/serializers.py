@@ -0,0 +1,52 @@
+"""
+Serializer produk ringan untuk endpoint JSON katalog.
+
+Menghasilkan bentuk yang sama dengan django.core.serializers ({pk, model, fields}),
+tetapi langsung dari values() sehingga tidak ada model instance dan tidak ada
+encode/decode JSON berulang. Nilai Decimal/datetime di-encode oleh DjangoJSONEncoder
+milik JsonResponse, sama seperti serializer bawaan Django.
+"""
+
+PRODUCT_MODEL_LABEL = 'main.product'
+
+PRODUCT_FIELDS = (
+    'seller',
+    'product_name',
+    'old_price',
+    'special_price',
+    'discount_percent',
+    'category',
+    'description',
+    'thumbnail',
+    'stock',
+    'created_at',
+    'updated_at',
+    'avg_rating',
+)
+
+
+def parse_fields(raw):
+    """Parse ?fields=a,b,c menjadi tuple field yang valid (urutan mengikuti PRODUCT_FIELDS)."""
+    if not raw:
+        return PRODUCT_FIELDS
+    requested = {name.strip() for name in raw.split(',')}
+    fields = tuple(name for name in PRODUCT_FIELDS if name in requested)
+    return fields or PRODUCT_FIELDS
+
+
+def product_rows(queryset, fields=PRODUCT_FIELDS, extra=()):
+    """values() queryset berisi id, field yang diminta, dan field tambahan (mis. sort key)."""
+    columns = dict.fromkeys(('id',) + tuple(fields) + tuple(extra))
+    return queryset.values(*columns)
+
+
+def row_to_payload(row, fields=PRODUCT_FIELDS):
+    return {
+        "pk": str(row['id']),
+        "model": PRODUCT_MODEL_LABEL,
+        "fields": {name: row[name] for name in fields},
+    }
+
+
+def serialize_products(queryset, fields=PRODUCT_FIELDS):
+    return [row_to_payload(row, fields) for row in product_rows(queryset, fields)]
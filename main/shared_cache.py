@@ -0,0 +1,45 @@
+"""
+Cache Django untuk version stamp yang harus terlihat oleh semua worker
+(main/product_cache.py, main/user_context.py).
+
+LocMemCache hidup di dalam satu proses: token yang diganti satu worker tidak
+pernah sampai ke worker lain, jadi invalidasi tidak berlaku di sana. Di
+PRODUCTION (banyak worker gunicorn) cache seperti itu dianggap tidak ada dan
+pemanggil kembali membaca database; set REDIS_URL supaya cache dipakai.
+Di development (runserver satu proses) dan test LocMemCache tetap dipakai.
+"""
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+
+PROCESS_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def get_shared_cache(alias='default'):
+    """Cache dengan alias tersebut, atau None kalau hanya berlaku per proses di PRODUCTION."""
+    backend = settings.CACHES.get(alias, {}).get('BACKEND', '')
+    if getattr(settings, 'PRODUCTION', False) and backend in PROCESS_LOCAL_BACKENDS:
+        return None
+    return caches[alias]
+
+
+def new_token():
+    return uuid.uuid4().hex
+
+
+def version_tokens(cache, keys):
+    """Token version untuk setiap key (satu get_many); key yang belum ada diberi token baru."""
+    tokens = cache.get_many(keys)
+    for key in keys:
+        if key in tokens:
+            continue
+        token = new_token()
+        # add() tidak menimpa token yang baru saja dibuat worker lain
+        if not cache.add(key, token, timeout=None):
+            token = cache.get(key, token)
+        tokens[key] = token
+    return tokens
+
+
+def version_token(cache, key):
+    return version_tokens(cache, [key])[key]
@@ -1,7 +1,10 @@
-from django.db.models.signals import post_save
+from collections import Counter
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from main.models import Profile
+from main import autocomplete, facets, product_cache, search, user_context
+from main.models import Product, Profile
 
 @receiver(post_save, sender=User)
 def create_or_update_user_profile(sender, instance, created, **kwargs):
@@ -14,4 +17,74 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
         try:
             instance.profile.save()
         except Profile.DoesNotExist:
-            Profile.objects.create(user=instance)
\ No newline at end of file
+            Profile.objects.create(user=instance)
+
+
+# ========== CATEGORY FACETS ==========
+@receiver(post_init, sender=Product)
+def remember_product_category(sender, instance, **kwargs):
+    # Lewat __dict__ supaya field yang di-defer tidak memicu query tambahan
+    instance._facet_category = instance.__dict__.get('category')
+
+@receiver(post_save, sender=Product)
+def update_category_facet_on_save(sender, instance, created, **kwargs):
+    deltas = Counter({instance.category: 1})
+    if not created:
+        if instance._facet_category is None:
+            # Kategori lama tidak diketahui (field di-defer), biarkan rebuild_facets yang membetulkan
+            return
+        # adjust_counts menormalisasi kategori, jadi perubahan huruf besar/kecil saling meniadakan
+        deltas[instance._facet_category] -= 1
+    facets.adjust_counts(facets.INTERNAL, deltas)
+    instance._facet_category = instance.category
+
+@receiver(post_delete, sender=Product)
+def update_category_facet_on_delete(sender, instance, **kwargs):
+    facets.adjust_counts(facets.INTERNAL, {instance._facet_category: -1})
+
+
+# ========== SEARCH INDEX ==========
+@receiver(post_save, sender=Product)
+def update_search_index_on_save(sender, instance, **kwargs):
+    search.get_backend().index_products([instance])
+    autocomplete.index.update_products([instance])
+
+@receiver(post_delete, sender=Product)
+def update_search_index_on_delete(sender, instance, **kwargs):
+    search.get_backend().remove_product(instance.pk)
+    autocomplete.index.remove_product(instance.pk)
+
+
+# ========== PRODUCT READ CACHE ==========
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    product_cache.invalidate(instance.pk)
+
+@receiver(post_init, sender=Profile)
+@receiver(post_init, sender=User)
+def remember_seller_display(sender, instance, **kwargs):
+    field = 'store_name' if sender is Profile else 'username'
+    instance._cached_display = instance.__dict__.get(field)
+
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=User)
+def invalidate_product_cache_for_seller(sender, instance, **kwargs):
+    # Produk di-cache bersama seller dan profile-nya, jadi hanya perubahan nama toko/username yang relevan
+    # (bukan setiap save, misalnya last_login saat login)
+    current = instance.store_name if sender is Profile else instance.username
+    if current != getattr(instance, '_cached_display', current):
+        product_cache.invalidate_all()
+    instance._cached_display = current
+
+
+# ========== SESSION USER CONTEXT ==========
+@receiver(user_logged_in)
+def remember_user_context(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        user_context.remember(request, user)
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_user_context(sender, instance, **kwargs):
+    user_context.invalidate(instance.user_id)
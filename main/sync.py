@@ -0,0 +1,89 @@
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from main import autocomplete, categories, facets, search
+from main.models import Product, ProductsData, SyncState
+
+EXTERNAL_DB = 'product_data'
+SYNC_SOURCE = 'products_data'
+DEFAULT_BATCH_SIZE = 500
+
+
+def infer_category(name: str):
+    """Label kategori ("Badminton", "Cricket", ...) untuk nama produk eksternal."""
+    return categories.label(categories.classify(name))
+
+
+def iter_batches(rows, batch_size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def sync_products_data(batch_size=DEFAULT_BATCH_SIZE, full=False):
+    """
+    Impor baris baru dari products_data ke Product.
+
+    Hanya baris dengan ROWID di atas watermark yang dibaca, lalu disimpan
+    per batch dengan bulk_create. Watermark maju setiap batch sehingga sync
+    yang terputus bisa dilanjutkan. Mengembalikan jumlah produk yang dibuat.
+    """
+    if EXTERNAL_DB not in settings.DATABASES:
+        return 0
+
+    state, _ = SyncState.objects.get_or_create(source=SYNC_SOURCE)
+    start_rowid = 0 if full else state.last_rowid
+    if full:
+        # Semua baris eksternal akan dihitung ulang di bawah
+        facets.reset_counts(facets.EXTERNAL)
+
+    rows = (
+        ProductsData.objects.using(EXTERNAL_DB)
+        .filter(data_id__gt=start_rowid)
+        .order_by('data_id')
+        .values_list('data_id', 'product_name', 'old_price', 'special_price', 'discount_field')
+    )
+
+    created = 0
+    for batch in iter_batches(rows.iterator(chunk_size=batch_size), batch_size):
+        names = {name or "Unnamed Product" for _, name, _, _, _ in batch}
+        existing = set(
+            Product.objects.filter(product_name__in=names).values_list('product_name', flat=True)
+        )
+
+        labels = [categories.label(c) for c in categories.classify_many(row[1] for row in batch)]
+        new_products = []
+        for (_, name, old_price, special_price, discount), category in zip(batch, labels):
+            name = name or "Unnamed Product"
+            if name in existing:
+                continue
+            existing.add(name)
+            new_products.append(Product(
+                seller=None,
+                product_name=name,
+                old_price=old_price or 0,
+                special_price=special_price or 0,
+                discount_percent=int(discount or 0),
+                category=category,
+                description="No description for this product",
+                thumbnail="",
+                stock=10,
+            ))
+
+        with transaction.atomic():
+            Product.objects.bulk_create(new_products, batch_size=batch_size)
+            # bulk_create tidak mengirim post_save, jadi facet diperbarui di sini
+            facets.adjust_counts(facets.INTERNAL, Counter(p.category for p in new_products))
+            facets.adjust_counts(facets.EXTERNAL, Counter(labels))
+            search.get_backend().index_products(new_products)
+            autocomplete.index.update_products(new_products)
+            state.last_rowid = batch[-1][0]
+            state.save(update_fields=['last_rowid', 'updated_at'])
+        created += len(new_products)
+
+    return created
@@ -1,7 +1,8 @@
 import uuid
 import json
+import threading
 from decimal import Decimal
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth.models import User
 from main.models import Product, Profile
@@ -237,7 +238,7 @@ class MainPageViewTests(MainViewsSetup):
     databases = {'default', 'product_data'}
 
     # NEW: Test show_main with mocked external database
-    @patch('main.views.ProductsData.objects')
+    @patch('main.models.ProductsData.objects')
     def test_show_main_view_logged_in_buyer(self, mock_products_data):
         mock_db = MagicMock()
         mock_db.all.return_value = []
@@ -250,7 +251,7 @@ class MainPageViewTests(MainViewsSetup):
         self.assertIn(self.product1_seller, response.context['product_list'])
         self.assertEqual(response.context['role'], 'buyer')
 
-    @patch('main.views.ProductsData.objects')
+    @patch('main.models.ProductsData.objects')
     def test_show_main_view_logged_in_seller(self, mock_products_data):
         mock_db = MagicMock()
         mock_db.all.return_value = []
@@ -262,7 +263,7 @@ class MainPageViewTests(MainViewsSetup):
         self.assertEqual(response.context['role'], 'seller')
         self.assertIn(self.product1_seller, response.context['product_list'])
 
-    @patch('main.views.ProductsData.objects')
+    @patch('main.models.ProductsData.objects')
     def test_show_main_view_seller_my_products_filter(self, mock_products_data):
         mock_db = MagicMock()
         mock_db.all.return_value = []
@@ -276,7 +277,7 @@ class MainPageViewTests(MainViewsSetup):
         self.assertIn(self.product2_seller, product_list_context)
         self.assertNotIn(self.product3_other, product_list_context)
 
-    @patch('main.views.ProductsData.objects')
+    @patch('main.models.ProductsData.objects')
     def test_show_main_view_category_filter(self, mock_products_data):
         mock_db = MagicMock()
         mock_db.all.return_value = []
@@ -291,7 +292,7 @@ class MainPageViewTests(MainViewsSetup):
         self.assertIn(self.product3_other, product_list_context)
         self.assertNotIn(self.product2_seller, product_list_context)
 
-    @patch('main.views.ProductsData.objects')
+    @patch('main.models.ProductsData.objects')
     def test_show_main_view_admin(self, mock_products_data):
         mock_db = MagicMock()
         mock_db.all.return_value = []
@@ -304,7 +305,7 @@ class MainPageViewTests(MainViewsSetup):
         self.assertTrue(response.context['is_admin'])
 
     # NEW: Test user without profile
-    @patch('main.views.ProductsData.objects')
+    @patch('main.models.ProductsData.objects')
     def test_show_main_user_without_profile_defaults_to_buyer(self, mock_products_data):
         mock_db = MagicMock()
         mock_db.all.return_value = []
@@ -365,7 +366,7 @@ class ProductDetailViewTests(MainViewsSetup):
         self.assertFalse(response.context['can_modify'])
 
 
-@patch('main.views.ProductsData.objects')
+@patch('main.models.ProductsData.objects')
 @patch('django.conf.settings')
 class SerializationViewsTests(MainViewsSetup):
     def test_show_json(self, mock_settings, mock_products_data_manager):
@@ -600,11 +601,995 @@ class AjaxCRUDTests(MainViewsSetup):
 class HelperFunctionTests(TestCase):
 
     def test_infer_category(self):
-        from main.views import infer_category
+        from main.sync import infer_category
         self.assertEqual(infer_category("Yonex Badminton Racket"), "Badminton")
         self.assertEqual(infer_category("SG Cricket Bat"), "Cricket")
         self.assertEqual(infer_category("NIVIA Volleyball PU 5000"), "Volleyball")
         self.assertEqual(infer_category("Swimming Goggles"), "Accessory")
         self.assertEqual(infer_category("A generic item"), "Accessory")
         self.assertEqual(infer_category(None), "Accessory")
-        self.assertEqual(infer_category(""), "Accessory")
\ No newline at end of file
+        self.assertEqual(infer_category(""), "Accessory")
+
+def create_products_data_table(rows):
+    from django.db import connections
+    with connections['product_data'].cursor() as cursor:
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS products_data ('
+            '"Product Name" TEXT, "Old Price" REAL, "Special Price" REAL, "Discount %" REAL, "Product" TEXT)'
+        )
+        cursor.executemany('INSERT INTO products_data VALUES (%s, %s, %s, %s, %s)', rows)
+
+
+class CategoryClassifierTests(TestCase):
+    def test_priority_and_overlapping_keywords(self):
+        from main.categories import CategoryClassifier, classify_many
+        self.assertEqual(
+            classify_many(["Yonex Badminton Racket", "NIVIA Volleyball PU 5000", "Nike Football",
+                           "SG Cricket Bat", "Cosco Basketball", "Kit Bag", "Swimming Goggles", None]),
+            ['badminton', 'volleyball', 'football', 'cricket', 'basketball', 'accessory', 'accessory', 'accessory'],
+        )
+        custom = CategoryClassifier([('hockey', ['stick']), ('cricket', ['bat'])], default='other')
+        self.assertEqual(custom.classify_many(["Hockey Stick", "Bat", "Cap"]), ['hockey', 'cricket', 'other'])
+
+    def test_batch_scans_each_distinct_name_once(self):
+        from main.categories import CategoryClassifier, DEFAULT_CATEGORY, DEFAULT_RULES, normalize_name
+        names = [f"Brand {i % 50} {'Racket' if i % 3 else 'Cricket Ball'} Model {i % 7}" for i in range(10_000)]
+        classifier = CategoryClassifier(DEFAULT_RULES)
+        with patch.object(classifier, '_classify', wraps=classifier._classify) as scan:
+            result = classifier.classify_many(names + [name.upper() for name in names[:100]])
+        self.assertEqual(scan.call_count, len({normalize_name(name) for name in names}))
+
+        def reference(name):
+            # Aturan apa adanya: kategori pertama yang salah satu keyword-nya muncul di nama
+            normalized = normalize_name(name)
+            for category, keywords in DEFAULT_RULES:
+                if any(keyword in normalized for keyword in keywords):
+                    return category
+            return DEFAULT_CATEGORY
+        self.assertEqual(result[:len(names)], [reference(name) for name in names])
+        self.assertEqual(result[:3], ['cricket', 'badminton', 'badminton'])
+
+
+class ProductSyncTests(TestCase):
+    databases = {'default', 'product_data'}
+
+    def setUp(self):
+        create_products_data_table([
+            ("Yonex Badminton Racket", 1000.0, 800.0, 20.0, "Racket"),
+            ("SG Cricket Bat", 500.0, 500.0, 0.0, "Bat"),
+            ("SG Cricket Bat", 500.0, 500.0, 0.0, "Bat"),
+        ])
+
+    def test_sync_creates_products_once_and_advances_watermark(self):
+        from main.models import SyncState
+        from main.sync import sync_products_data, SYNC_SOURCE
+        self.assertEqual(sync_products_data(), 2)
+        self.assertEqual(Product.objects.filter(product_name="SG Cricket Bat").count(), 1)
+        self.assertEqual(Product.objects.get(product_name="Yonex Badminton Racket").category, "Badminton")
+        self.assertEqual(SyncState.objects.get(source=SYNC_SOURCE).last_rowid, 3)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(sync_products_data(), 0)
+
+    def test_sync_only_processes_rows_after_watermark(self):
+        from main.sync import sync_products_data
+        sync_products_data(batch_size=2)
+        create_products_data_table([("Nivia Volleyball", 300.0, 250.0, 16.0, "Ball")])
+        self.assertEqual(sync_products_data(), 1)
+        self.assertTrue(Product.objects.filter(product_name="Nivia Volleyball").exists())
+
+    def test_show_json_does_not_sync(self):
+        response = self.client.get(reverse('main:show_json'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Product.objects.filter(product_name="SG Cricket Bat").exists())
+
+
+class ProductImportTests(TestCase):
+    databases = {'default', 'product_data'}
+
+    def setUp(self):
+        self.seller = User.objects.create_user(username='gosport_admin', password='password123')
+        create_products_data_table([
+            ("Yonex Badminton Racket", 1000.0, 800.0, 20.0, "Racket"),
+            ("SG Cricket Bat", 500.0, 500.0, 0.0, "Bat"),
+            ("SG Cricket Bat", 450.0, 450.0, 0.0, "Bat"),
+            ("Nivia Volleyball", 300.0, 250.0, 16.4, "Ball"),
+        ])
+
+    def test_import_groups_by_name_and_is_idempotent(self):
+        from django.core.management import call_command
+        from io import StringIO
+        call_command('import_products', '--batch-size=2', stdout=StringIO())
+        call_command('import_products', stdout=StringIO())
+
+        self.assertEqual(Product.objects.count(), 3)
+        bat = Product.objects.get(product_name="SG Cricket Bat")
+        self.assertEqual((bat.stock, bat.old_price, bat.seller), (2, Decimal('500.00'), self.seller))
+        self.assertEqual(Product.objects.get(product_name="Nivia Volleyball").discount_percent, 16)
+        self.assertEqual(Product.objects.get(product_name="Yonex Badminton Racket").category, 'badminton')
+        self.assertEqual(Product.objects.get(product_name="Nivia Volleyball").category, 'volleyball')
+
+    def test_import_without_external_database_reports_error(self):
+        from django.conf import settings
+        from django.core.management import call_command
+        from io import StringIO
+        out = StringIO()
+        with override_settings(DATABASES={'default': settings.DATABASES['default']}):
+            call_command('import_products', stdout=out)
+        self.assertIn("Database 'product_data' is not configured", out.getvalue())
+        self.assertEqual(Product.objects.count(), 0)
+
+    def test_reimport_updates_stock_and_adopts_legacy_rows(self):
+        from main.importer import import_products_data
+        from main.models import CategoryFacet
+        legacy = Product.objects.create(seller=self.seller, product_name="SG Cricket Bat", old_price=1,
+                                        special_price=1, stock=1, category='cricket')
+        create_products_data_table([("SG Cricket Bat", 500.0, 500.0, 0.0, "Bat")])
+
+        result = import_products_data(self.seller, batch_size=10)
+        self.assertEqual(result.groups, 3)
+        legacy.refresh_from_db()
+        self.assertEqual((legacy.stock, legacy.category), (3, 'cricket'))
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertEqual(
+            dict(CategoryFacet.objects.filter(source='internal', count__gt=0).values_list('category', 'count')),
+            {'badminton': 1, 'cricket': 1, 'volleyball': 1},
+        )
+
+
+class CatalogIngestTests(TestCase):
+    def setUp(self):
+        import tempfile
+        self.seller = User.objects.create_user(username='supplier', password='password123')
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write(self, name, content):
+        import os
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_parse_price_and_normalize(self):
+        from main.ingest import InvalidRow, normalize_record, parse_price
+        self.assertEqual(parse_price('Rp 1.250.000'), Decimal('1250000.00'))
+        self.assertEqual(parse_price('1,250.50'), Decimal('1250.50'))
+        self.assertEqual(parse_price(12.5), Decimal('12.50'))
+        for bad in ['-5', float('nan'), float('inf'), 10 ** 10, '99999999999', True]:
+            with self.assertRaises(InvalidRow):
+                parse_price(bad)
+
+        record = normalize_record({'Name': 'Yonex Racket', 'Price': '200', 'Sale Price': '150', 'Quantity': '3'})
+        self.assertEqual((record['discount_percent'], record['category'], record['stock']), (25, 'badminton', 3))
+        with self.assertRaises(InvalidRow):
+            normalize_record({'name': 'Cheap', 'old_price': '10', 'special_price': '20'})
+        self.assertEqual(normalize_record({'name': 'Bat', 'price': 10, 'stock': 4.0})['stock'], 4)
+        for bad in [{'stock': float('inf')}, {'stock': float('nan')}, {'stock': 1.5}, {'stock': True},
+                    {'name': 'x' * 256}, {'thumbnail': 'http://img.test/' + 'a' * 200}]:
+            with self.assertRaises(InvalidRow):
+                normalize_record({'name': 'Bat', 'price': 10, **bad})
+
+    def test_ingest_csv_and_jsonl_with_process_pool(self):
+        from django.core.management import call_command
+        from io import StringIO
+        rows = '\n'.join(f'Ball {i},{100 + i},{90 + i},{i},football' for i in range(30))
+        csv_path = self._write('feed.csv', 'name,price,sale_price,stock,category\n' + rows + '\nBroken,abc,,1,\n')
+        jsonl_path = self._write('feed.jsonl', '\n'.join([
+            json.dumps({'product_name': 'Nivia Volleyball', 'old_price': 300, 'special_price': 250}),
+            json.dumps({'product_name': 'Ball 0', 'old_price': '120', 'special_price': '120', 'stock': 9}),
+            'not json',
+            json.dumps({'product_name': 'Ghost', 'old_price': float('nan')}),
+            json.dumps({'product_name': 'Flag', 'old_price': True}),
+            json.dumps({'product_name': 'Endless', 'old_price': 10, 'stock': float('inf')}),
+            json.dumps({'product_name': 'Long ' + 'x' * 255, 'old_price': 10}),
+        ]))
+
+        out, err = StringIO(), StringIO()
+        args = [csv_path, jsonl_path, '--seller=supplier', '--workers=2', '--chunk-bytes=200', '--batch-size=7']
+        call_command('ingest_catalog', *args, stdout=out, stderr=err)
+        self.assertIn('38 rows (6 invalid', out.getvalue())
+        self.assertEqual(Product.objects.count(), 31)
+        self.assertEqual(Product.objects.get(product_name='Nivia Volleyball').discount_percent, 17)
+        self.assertEqual(Product.objects.get(product_name='Ball 29').category, 'football')
+
+        call_command('ingest_catalog', *args, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Product.objects.count(), 31)
+
+
+class ProductCacheTests(MainViewsSetup):
+    def setUp(self):
+        from django.core.cache import cache
+        from main import product_cache
+        super().setUp()
+        cache.clear()
+        product_cache.local.clear()
+
+    def test_lookups_cached_until_product_changes(self):
+        from main.product_cache import get_product
+        pk = self.product1_seller.pk
+        with self.assertNumQueries(1):
+            get_product(pk)
+        with self.assertNumQueries(0):
+            cached = get_product(str(pk).upper())
+            self.assertEqual(cached.seller.profile.role, 'seller')
+
+        cached.product_name = "Mutated copy"
+        self.assertEqual(get_product(pk).product_name, self.product1_seller.product_name)
+
+        self.product1_seller.stock = 99
+        self.product1_seller.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_product(pk).stock, 99)
+
+        self.product1_seller.delete()
+        with self.assertRaises(Product.DoesNotExist):
+            get_product(pk)
+
+    def test_store_name_change_refreshes_seller_display(self):
+        url = reverse('main:show_json_by_id', args=[self.product1_seller.pk])
+        self.client.get(url)
+        self.seller_profile.store_name = "Sport Corner"
+        self.seller_profile.save()
+        self.assertEqual(json.loads(self.client.get(url).content)[0]['fields']['seller_display'], "Sport Corner")
+
+    def test_login_does_not_flush_cache(self):
+        from main.product_cache import get_product
+        get_product(self.product1_seller.pk)
+        self.client.login(username='testbuyer', password='password123')
+        with self.assertNumQueries(0):
+            get_product(self.product1_seller.pk)
+
+    def test_local_entries_expire(self):
+        from main.product_cache import LocalLRU
+        lru = LocalLRU(2, ttl=5)
+        with patch('main.product_cache.time.monotonic', return_value=100):
+            lru.set('a', 'v1', 'product')
+            self.assertEqual(lru.get('a', 'v1'), 'product')
+            self.assertIsNone(lru.get('a', 'v2'))
+        with patch('main.product_cache.time.monotonic', return_value=105):
+            self.assertIsNone(lru.get('a', 'v1'))
+
+    @override_settings(PRODUCTION=True)
+    def test_process_local_cache_is_not_used_in_production(self):
+        from main.product_cache import get_product
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                get_product(self.product1_seller.pk)
+
+    def test_write_paths_do_not_use_stale_cached_copy(self):
+        from cart.models import CartItem
+        from main.product_cache import get_product
+        pk = self.product1_seller.pk
+        get_product(pk)
+        # update() tidak mengirim signal, jadi salinan di cache sekarang basi
+        Product.objects.filter(pk=pk).update(special_price=Decimal('70.00'), stock=3)
+
+        self.client.login(username='testbuyer', password='password123')
+        self.client.post(reverse('cart:add_to_cart', args=[pk]))
+        self.assertEqual(CartItem.objects.get(product_id=pk).price, Decimal('70.00'))
+
+        self.client.post(reverse('rating:add_review_ajax', args=[pk]), {'rating': 4, 'review': 'ok'})
+        product = Product.objects.get(pk=pk)
+        self.assertEqual(product.avg_rating, 4.0)
+        self.assertEqual(product.special_price, Decimal('70.00'))
+        self.assertEqual(product.stock, 3)
+
+
+class BatchProductJsonTests(MainViewsSetup):
+    def test_batch_matches_single_lookup_in_one_query(self):
+        self.seller_profile.store_name = "Seller Store"
+        self.seller_profile.save()
+        ids = [self.product3_other.pk, uuid.uuid4(), self.product1_seller.pk, self.product_no_seller.pk]
+        url = reverse('main:show_json_batch')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'ids': ','.join(str(pk) for pk in ids)})
+        data = json.loads(response.content)
+        self.assertEqual([item['pk'] for item in data],
+                         [str(self.product3_other.pk), str(self.product1_seller.pk), str(self.product_no_seller.pk)])
+        single = json.loads(self.client.get(reverse('main:show_json_by_id', args=[self.product1_seller.pk])).content)
+        self.assertEqual(data[1], single[0])
+        self.assertEqual(data[1]['fields']['seller_display'], "Seller Store")
+        self.assertEqual(data[2]['fields']['seller_display'], "N/A")
+
+        response = self.client.post(url, json.dumps({'ids': [str(self.product2_seller.pk)]}), content_type='application/json')
+        self.assertEqual(json.loads(response.content)[0]['pk'], str(self.product2_seller.pk))
+
+    @override_settings(PRODUCT_BATCH_MAX=2)
+    def test_batch_rejects_invalid_and_oversized_requests(self):
+        url = reverse('main:show_json_batch')
+        self.assertEqual(self.client.get(url, {'ids': 'not-a-uuid'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'ids': ','.join(str(uuid.uuid4()) for _ in range(3))}).status_code, 400)
+        self.assertEqual(json.loads(self.client.get(url).content), [])
+
+
+class PaginatedJsonTests(MainViewsSetup):
+    def setUp(self):
+        super().setUp()
+        self.page_url = reverse('main:show_json_paginated')
+
+    def test_pages_cover_catalog_without_duplicates(self):
+        response = self.client.get(self.page_url, {'page_size': 3})
+        self.assertEqual(response.status_code, 200)
+        first = json.loads(response.content)
+        self.assertEqual(len(first['results']), 3)
+        self.assertIsNotNone(first['next'])
+
+        response = self.client.get(self.page_url, {'page_size': 3, 'cursor': first['next']})
+        second = json.loads(response.content)
+        self.assertEqual(len(second['results']), 1)
+        self.assertIsNone(second['next'])
+
+        pks = [item['pk'] for item in first['results'] + second['results']]
+        self.assertEqual(len(set(pks)), Product.objects.count())
+
+    def test_sort_by_price_descending(self):
+        response = self.client.get(self.page_url, {'sort': '-special_price', 'page_size': 2})
+        data = json.loads(response.content)
+        prices = [Decimal(item['fields']['special_price']) for item in data['results']]
+        self.assertEqual(prices, [Decimal('150.00'), Decimal('110.00')])
+
+        response = self.client.get(self.page_url, {'page_size': 2, 'cursor': data['next']})
+        prices = [Decimal(item['fields']['special_price']) for item in json.loads(response.content)['results']]
+        self.assertEqual(prices, [Decimal('80.00'), Decimal('50.00')])
+
+    def test_invalid_cursor(self):
+        import base64
+        response = self.client.get(self.page_url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+        for payload in [['created_at', '2020-01-01T00:00:00+00:00', 'not-a-uuid'],
+                        ['created_at', '2020-01-01T00:00:00+00:00', None],
+                        ['product_name', None, str(uuid.uuid4())]]:
+            cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            response = self.client.get(self.page_url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, payload)
+
+
+class ProductSerializerTests(MainViewsSetup):
+    def test_show_json_matches_django_serializer(self):
+        from django.core import serializers
+        expected = json.loads(serializers.serialize('json', Product.objects.all()))
+        response = self.client.get(self.json_url)
+        self.assertEqual(json.loads(response.content), expected)
+
+    def test_show_json_sparse_fields(self):
+        response = self.client.get(self.json_url, {'fields': 'product_name,special_price,thumbnail,bogus'})
+        data = json.loads(response.content)
+        self.assertEqual(len(data), 4)
+        for item in data:
+            self.assertEqual(set(item['fields']), {'product_name', 'special_price', 'thumbnail'})
+            self.assertEqual(item['model'], 'main.product')
+
+    def test_paginated_sparse_fields_omit_sort_column(self):
+        response = self.client.get(reverse('main:show_json_paginated'), {'fields': 'product_name', 'page_size': 2})
+        data = json.loads(response.content)
+        self.assertEqual(set(data['results'][0]['fields']), {'product_name'})
+        self.assertIsNotNone(data['next'])
+
+    def test_show_json_query_count(self):
+        with self.assertNumQueries(1):
+            self.client.get(self.json_url)
+
+
+class StreamingExportTests(MainViewsSetup):
+    def _content(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_export_json_matches_show_json(self):
+        response = self.client.get(reverse('main:export_json'))
+        self.assertEqual(response['content-type'], 'application/json')
+        exported = json.loads(self._content(response))
+        listed = json.loads(self.client.get(self.json_url).content)
+        self.assertEqual(sorted(exported, key=lambda p: p['pk']), sorted(listed, key=lambda p: p['pk']))
+
+    def test_export_ndjson_one_product_per_line(self):
+        response = self.client.get(reverse('main:export_ndjson'), {'fields': 'product_name'})
+        lines = self._content(response).splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(set(json.loads(lines[0])['fields']), {'product_name'})
+
+    @patch('main.exports.get_chunk_size', return_value=3)
+    def test_export_xml_is_single_document_across_chunks(self, _mock_chunk_size):
+        from xml.dom import minidom
+        response = self.client.get(reverse('main:export_xml'))
+        document = minidom.parseString(self._content(response))
+        self.assertEqual(len(document.getElementsByTagName('object')), 4)
+
+    def test_export_empty_catalog(self):
+        Product.objects.all().delete()
+        response = self.client.get(reverse('main:export_json'))
+        self.assertEqual(json.loads(self._content(response)), [])
+
+
+class CatalogFilterTests(MainViewsSetup):
+    def _names(self, url, params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        items = data['results'] if isinstance(data, dict) else data
+        return {item['fields']['product_name'] for item in items}
+
+    def test_category_filter_is_case_insensitive(self):
+        Product.objects.filter(pk=self.product3_other.pk).update(category='Cricket')
+        names = self._names(self.json_url, {'category': 'CRICKET'})
+        self.assertEqual(names, {"Seller Product 1", "Other Seller Product"})
+
+    def test_seller_me(self):
+        self.client.login(username=self.seller_user.username, password='password123')
+        names = self._names(reverse('main:show_json_paginated'), {'seller': 'me'})
+        self.assertEqual(names, {"Seller Product 1", "Seller Product 2"})
+
+    def test_seller_me_anonymous_is_empty(self):
+        self.assertEqual(self._names(self.json_url, {'seller': 'me'}), set())
+
+    def test_price_stock_and_text_filters(self):
+        Product.objects.filter(pk=self.product2_seller.pk).update(stock=0)
+        names = self._names(self.json_url, {'min_price': '50', 'max_price': '110', 'in_stock': 'true'})
+        self.assertEqual(names, {"Seller Product 1", "Other Seller Product"})
+        self.assertEqual(self._names(self.json_url, {'q': 'external'}), {"External Product"})
+
+    def test_invalid_price(self):
+        response = self.client.get(self.json_url, {'min_price': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)['status'], 'error')
+
+
+class CategoryFacetTests(MainViewsSetup):
+    def _counts(self):
+        from main.facets import get_facets
+        return {facet['category']: facet['count'] for facet in get_facets()}
+
+    def test_counts_follow_create_edit_delete(self):
+        self.assertEqual(self._counts(), {'accessory': 1, 'cricket': 2, 'football': 1})
+
+        self.product1_seller.category = 'Football'
+        self.product1_seller.save()
+        self.assertEqual(self._counts(), {'accessory': 1, 'cricket': 1, 'football': 2})
+
+        self.product_no_seller.delete()
+        self.assertEqual(self._counts(), {'cricket': 1, 'football': 2})
+
+    def test_unchanged_save_does_not_query_facets(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        product = Product.objects.get(pk=self.product2_seller.pk)
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+        self.assertFalse(any('main_categoryfacet' in q['sql'] for q in queries.captured_queries))
+
+    def test_rebuild_matches_incremental(self):
+        from main.facets import rebuild_facets
+        before = self._counts()
+        rebuild_facets(include_external=False)
+        self.assertEqual(self._counts(), before)
+
+    def test_json_endpoint(self):
+        response = self.client.get(reverse('main:show_category_facets'))
+        data = json.loads(response.content)
+        self.assertEqual(data['categories'][0], {'category': 'accessory', 'count': 1, 'external_count': 0})
+
+    def test_show_main_uses_facets(self):
+        self.client.login(username=self.buyer_user.username, password='password123')
+        response = self.client.get(self.main_url)
+        self.assertEqual(response.context['categories'], ['accessory', 'cricket', 'football'])
+
+
+class SyncFacetTests(TestCase):
+    databases = {'default', 'product_data'}
+
+    def test_sync_updates_internal_and_external_facets(self):
+        from main.facets import get_facets
+        from main.sync import sync_products_data
+        create_products_data_table([
+            ("Yonex Badminton Racket", 1000.0, 800.0, 20.0, "Racket"),
+            ("Yonex Badminton Racket", 1000.0, 800.0, 20.0, "Racket"),
+            ("Kit Bag", 500.0, 500.0, 0.0, "Bag"),
+        ])
+        sync_products_data()
+        sync_products_data(full=True)
+        self.assertEqual(get_facets(), [
+            {'category': 'accessory', 'count': 1, 'external_count': 1},
+            {'category': 'badminton', 'count': 1, 'external_count': 2},
+        ])
+
+
+class ProductSearchTests(MainViewsSetup):
+    def setUp(self):
+        super().setUp()
+        self.search_url = reverse('main:search_products_json')
+        self.racket = Product.objects.create(
+            product_name="Yonex Badminton Racket", old_price=Decimal('300.00'), special_price=Decimal('250.00'),
+            category='badminton', description="Lightweight racket", stock=3
+        )
+        self.grip = Product.objects.create(
+            product_name="Towel Grip", old_price=Decimal('20.00'), special_price=Decimal('20.00'),
+            category='accessory', description="Grip for any badminton racket", stock=30
+        )
+
+    def _search(self, **params):
+        response = self.client.get(self.search_url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_ranks_name_matches_first(self):
+        data = self._search(q='badminton racket')
+        self.assertEqual([item['fields']['product_name'] for item in data['results']],
+                         ["Yonex Badminton Racket", "Towel Grip"])
+        self.assertGreater(data['results'][0]['rank'], data['results'][1]['rank'])
+
+    def test_prefix_and_category_match(self):
+        names = [item['fields']['product_name'] for item in self._search(q='crick')['results']]
+        self.assertEqual(sorted(names), ["Other Seller Product", "Seller Product 1"])
+
+    def test_page_far_beyond_results_is_empty(self):
+        for page in ['1001', '100000000000000000000']:
+            data = self._search(q='yonex', page=page)
+            self.assertEqual((data['results'], data['has_next']), ([], False))
+
+    def test_index_rows_are_keyed_by_rowid(self):
+        from django.db import connection
+        from main.search import FTS_TABLE, fts_rowid
+        self.racket.save()
+        self.racket.save()
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+            self.assertEqual(cursor.fetchone()[0], Product.objects.count())
+            cursor.execute(f'SELECT product_name FROM {FTS_TABLE} WHERE rowid = %s', [fts_rowid(self.racket.pk)])
+            self.assertEqual(cursor.fetchone()[0], "Yonex Badminton Racket")
+            # Hapus per produk memakai constraint rowid (":=") di FTS5, bukan scan penuh
+            cursor.execute(f'EXPLAIN QUERY PLAN DELETE FROM {FTS_TABLE} WHERE rowid = %s', [1])
+            self.assertIn('INDEX 0:=', cursor.fetchall()[0][-1])
+
+    def test_index_follows_edit_and_delete(self):
+        self.racket.product_name = "Li-Ning Shuttle Pro"
+        self.racket.save()
+        self.assertEqual(len(self._search(q='yonex')['results']), 0)
+        self.assertEqual(len(self._search(q='shuttle')['results']), 1)
+
+        self.racket.delete()
+        self.assertEqual(len(self._search(q='shuttle')['results']), 0)
+
+    def test_pagination_and_syntax_safety(self):
+        data = self._search(q='product', page_size=2)
+        self.assertEqual(len(data['results']), 2)
+        self.assertTrue(data['has_next'])
+        data = self._search(q='product', page_size=2, page=2)
+        self.assertFalse(data['has_next'])
+
+        self.assertEqual(self._search(q='"OR (* NEAR')['results'], [])
+        self.assertEqual(self._search(q='')['results'], [])
+
+    @override_settings(PRODUCT_SEARCH_BACKEND='simple')
+    def test_simple_backend(self):
+        names = [item['fields']['product_name'] for item in self._search(q='grip')['results']]
+        self.assertEqual(names, ["Towel Grip"])
+
+
+class AutocompleteTests(MainViewsSetup):
+    def setUp(self):
+        from main import autocomplete
+        super().setUp()
+        Product.objects.filter(pk=self.product3_other.pk).update(avg_rating=4.5)
+        # Di produksi build berjalan di thread latar belakang; di sini dibangun langsung
+        autocomplete.index.reset()
+        autocomplete.index.build()
+        self.url = reverse('main:autocomplete_products')
+
+    def _labels(self, q):
+        response = self.client.get(self.url, {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [s['label'] for s in json.loads(response.content)['suggestions']]
+
+    def test_word_prefix_ranked_by_rating(self):
+        self.assertEqual(self._labels('prod'), ["Other Seller Product", "External Product",
+                                                "Seller Product 1", "Seller Product 2"])
+        self.assertEqual(self._labels('seller product 2'), ["Seller Product 2"])
+        self.assertEqual(self._labels('crick'), ["cricket"])
+        self.assertEqual(self._labels(''), [])
+
+    def test_no_queries_after_build_and_patched_by_signals(self):
+        self._labels('warmup')
+        with self.assertNumQueries(0):
+            self._labels('seller')
+
+        product = Product.objects.create(product_name="Shuttlecock Tube", old_price=10, special_price=10,
+                                         category='badminton', stock=1)
+        self.assertEqual(self._labels('shuttle'), ["Shuttlecock Tube"])
+        self.assertEqual(self._labels('badm'), ["badminton"])
+
+        product.product_name = "Feather Shuttle"
+        product.save()
+        self.assertEqual(self._labels('shuttlecock'), [])
+        self.assertEqual(self._labels('feather'), ["Feather Shuttle"])
+
+        product.delete()
+        self.assertEqual(self._labels('feather'), [])
+
+    def test_stale_index_is_rebuilt_in_background(self):
+        from main import autocomplete
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_build():
+            started.set()
+            release.wait(5)
+
+        with patch.object(autocomplete.index, 'is_stale', return_value=True), \
+                patch.object(autocomplete.index, 'build', side_effect=slow_build):
+            # Request tidak menunggu build; index lama tetap dipakai
+            self.assertEqual(self._labels('seller product 2'), ["Seller Product 2"])
+            self.assertTrue(started.wait(5))
+            thread = autocomplete.refresh_in_background()
+            self.assertEqual(self._labels('seller product 2'), ["Seller Product 2"])
+            release.set()
+            thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+    def test_signal_patches_during_build_are_kept(self):
+        from main import autocomplete
+        original_build = autocomplete.index._build
+
+        def racing_build():
+            # Produk disimpan saat build sedang membaca data; patch-nya harus ikut sesudah swap
+            autocomplete.index.update_products([Product(pk=uuid.uuid4(), product_name="Racing Net", category='')])
+            original_build()
+
+        autocomplete.index.reset()
+        with patch.object(autocomplete.index, '_build', side_effect=racing_build):
+            autocomplete.index.build()
+        self.assertEqual(self._labels('racing'), ["Racing Net"])
+
+
+class ProxyImageCacheTests(TestCase):
+    def setUp(self):
+        import tempfile
+        from main import image_cache, image_proxy
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        settings_override = override_settings(IMAGE_CACHE_DIR=self.tmpdir.name, IMAGE_CACHE_MAX_BYTES=1000)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        image_cache._cache = None
+        self.addCleanup(setattr, image_cache, '_cache', None)
+        image_proxy.breaker.reset()
+        image_proxy.negative_cache.reset()
+        self.url = reverse('main:proxy_image')
+
+    def _upstream(self, content=b'img', status=200, headers=None):
+        response = MagicMock(status_code=status)
+        response.iter_content.side_effect = lambda size: iter([content[i:i + 2] for i in range(0, len(content), 2)])
+        response.headers = {'Content-Type': 'image/png', **(headers or {})}
+        return response
+
+    def _get(self, url, **extra):
+        response = self.client.get(self.url, {'url': url}, **extra)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, body
+
+    @patch('main.image_proxy.fetch_upstream')
+    def test_second_request_served_from_disk(self, mock_fetch):
+        mock_fetch.return_value = self._upstream(headers={'Cache-Control': 'max-age=600'})
+        first, _ = self._get('http://img.test/a.png')
+        second, body = self._get('http://img.test/a.png')
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(body, b'img')
+        self.assertEqual(second['Content-Type'], 'image/png')
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('max-age=604800', second['Cache-Control'])
+
+        not_modified, body = self._get('http://img.test/a.png', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(body, b'')
+
+    @patch('main.image_proxy.fetch_upstream')
+    def test_malformed_url_is_handled(self, mock_fetch):
+        response, body = self._get('http://[::1')
+        self.assertEqual(response.status_code, 500)
+        self.assertIn(b'Error fetching image', body)
+        mock_fetch.assert_not_called()
+
+    async def test_async_malformed_url_is_handled(self):
+        from django.test import AsyncRequestFactory
+        from main.views import proxy_image_async
+        response = await proxy_image_async(AsyncRequestFactory().get('/proxy-image/', {'url': 'http://[::1'}))
+        self.assertEqual(response.status_code, 500)
+        self.assertIn(b'Error fetching image', response.content)
+
+    @patch('main.image_proxy.fetch_upstream')
+    def test_stale_entry_revalidated_with_upstream_etag(self, mock_fetch):
+        mock_fetch.return_value = self._upstream(headers={'Cache-Control': 'no-cache', 'ETag': '"v1"'})
+        self._get('http://img.test/b.png')
+
+        mock_fetch.return_value = self._upstream(content=b'', status=304)
+        _, body = self._get('http://img.test/b.png')
+        self.assertEqual(body, b'img')
+        self.assertEqual(mock_fetch.call_args[0][1], {'If-None-Match': '"v1"'})
+
+    @patch('main.image_proxy.fetch_upstream')
+    def test_no_store_is_not_cached_and_errors_fall_back_to_stale(self, mock_fetch):
+        import requests
+        mock_fetch.return_value = self._upstream(headers={'Cache-Control': 'no-store'})
+        response, body = self._get('http://img.test/c.png')
+        self.assertEqual(body, b'img')
+        self.assertEqual(response['Cache-Control'], 'no-store')
+        self.assertFalse(response.has_header('ETag'))
+        self._get('http://img.test/c.png')
+        self.assertEqual(mock_fetch.call_count, 2)
+
+        mock_fetch.return_value = self._upstream(headers={'Cache-Control': 'max-age=0'})
+        self._get('http://img.test/d.png')
+        mock_fetch.side_effect = requests.ConnectionError('down')
+        self.assertEqual(self._get('http://img.test/d.png')[1], b'img')
+        self.assertEqual(self._get('http://img.test/e.png')[0].status_code, 500)
+
+    @override_settings(IMAGE_PROXY_MAX_BYTES=5)
+    @patch('main.image_proxy.fetch_upstream')
+    def test_oversized_images_rejected_while_streaming(self, mock_fetch):
+        import os
+        mock_fetch.return_value = self._upstream(content=b'0123456789')
+        response, _ = self._get('http://img.test/big.png')
+        self.assertEqual(response.status_code, 502)
+        self.assertTrue(mock_fetch.return_value.close.called)
+        self.assertEqual([f for _, _, files in os.walk(self.tmpdir.name) for f in files if not f.endswith('.lock')], [])
+
+        mock_fetch.return_value = self._upstream(content=b'0123', headers={'Content-Length': '10'})
+        self.assertEqual(self._get('http://img.test/big2.png')[0].status_code, 502)
+        self.assertFalse(mock_fetch.return_value.iter_content.called)
+
+    def test_lru_eviction_keeps_recently_used(self):
+        import os
+        import time
+        from main.image_cache import get_cache
+        cache = get_cache()
+        cache.set('aa' * 32, b'x' * 400, 'image/png', 60)
+        cache.set('bb' * 32, b'x' * 400, 'image/png', 60)
+        old = time.time() - 100
+        os.utime(cache._paths('aa' * 32)[0], (old, old))
+        os.utime(cache._paths('bb' * 32)[0], (old - 10, old - 10))
+        cache.get('bb' * 32)  # hit memperbarui mtime
+
+        cache.set('cc' * 32, b'x' * 400, 'image/png', 60)
+        self.assertIsNone(cache.get('aa' * 32))
+        self.assertIsNotNone(cache.get('bb' * 32))
+        self.assertIsNotNone(cache.get('cc' * 32))
+
+    @patch('main.image_proxy.fetch_upstream')
+    def test_concurrent_misses_share_one_upstream_fetch(self, mock_fetch):
+        import threading
+        import time
+        from main.image_proxy import get_image
+
+        def slow_fetch(url, headers):
+            time.sleep(0.2)
+            return self._upstream(headers={'Cache-Control': 'max-age=600'})
+        mock_fetch.side_effect = slow_fetch
+
+        results = []
+        def worker():
+            image = get_image('http://img.test/popular.png')
+            results.append(image.file.read())
+            image.file.close()
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(results, [b'img'] * 5)
+
+    @override_settings(IMAGE_CACHE_MAX_BYTES=10 * 1024 * 1024)
+    @patch('main.image_proxy.fetch_upstream')
+    def test_resized_variants_cached_by_content(self, mock_fetch):
+        from io import BytesIO
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(buffer, 'PNG')
+        mock_fetch.return_value = self._upstream(content=buffer.getvalue(), headers={'Cache-Control': 'max-age=600'})
+
+        response = self.client.get(self.url, {'url': 'http://img.test/big.png', 'w': '300', 'fmt': 'webp'})
+        body = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        with Image.open(BytesIO(body)) as thumb:
+            self.assertEqual(thumb.size, (320, 240))
+        self.assertLess(len(body), len(buffer.getvalue()))
+
+        again = self.client.get(self.url, {'url': 'http://img.test/big.png', 'w': '320', 'fmt': 'webp'})
+        self.assertEqual(again['ETag'], response['ETag'])
+        self.assertEqual(mock_fetch.call_count, 1)
+
+        self.assertEqual(self.client.get(self.url, {'url': 'http://img.test/big.png', 'w': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'url': 'http://img.test/big.png', 'fmt': 'gif'}).status_code, 400)
+
+    @patch('main.image_proxy.fetch_upstream')
+    def test_undecodable_image_falls_back_to_original(self, mock_fetch):
+        mock_fetch.return_value = self._upstream(content=b'not an image')
+        response = self.client.get(self.url, {'url': 'http://img.test/bad.png', 'w': '160'})
+        self.assertEqual(b''.join(response.streaming_content), b'not an image')
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+    @patch('main.image_proxy.fetch_upstream')
+    def test_failing_urls_negative_cached_and_dead_hosts_short_circuited(self, mock_fetch):
+        import requests
+        from main import image_proxy
+        not_found = self._upstream(status=404)
+        not_found.raise_for_status.side_effect = requests.HTTPError('404', response=not_found)
+        mock_fetch.return_value = not_found
+        self.assertEqual(self._get('http://img.test/missing.png')[0].status_code, 500)
+        self.assertEqual(self._get('http://img.test/missing.png')[0].status_code, 500)
+        self.assertEqual(mock_fetch.call_count, 1)
+        self.assertEqual(image_proxy.breaker.state('img.test'), 'closed')
+
+        mock_fetch.return_value = None
+        mock_fetch.side_effect = requests.Timeout('timed out')
+        for i in range(image_proxy.breaker.threshold):
+            self._get(f'http://dead.test/{i}.png')
+        self.assertEqual(image_proxy.breaker.state('dead.test'), 'open')
+        calls = mock_fetch.call_count
+        self.assertEqual(self._get('http://dead.test/other.png')[0].status_code, 500)
+        self.assertEqual(mock_fetch.call_count, calls)
+
+    def test_breaker_half_open_probe(self):
+        from main.circuit_breaker import CircuitBreaker
+        breaker = CircuitBreaker(threshold=2, reset_timeout=0)
+        breaker.record_failure('h')
+        self.assertTrue(breaker.allow('h'))
+        breaker.record_failure('h')
+        self.assertEqual(breaker.state('h'), 'open')
+        self.assertTrue(breaker.allow('h'))   # probe setelah reset_timeout
+        self.assertFalse(breaker.allow('h'))  # hanya satu probe
+        breaker.record_failure('h')
+        self.assertEqual(breaker.state('h'), 'open')
+        self.assertTrue(breaker.allow('h'))
+        breaker.record_success('h')
+        self.assertEqual(breaker.state('h'), 'closed')
+
+    async def test_async_proxy_shares_cache_with_sync_path(self):
+        import httpx
+        from asgiref.sync import sync_to_async
+        from django.test import AsyncRequestFactory
+        from main import image_proxy_async
+        from main.views import proxy_image_async
+        calls = []
+
+        def handler(request):
+            calls.append(str(request.url))
+            if request.url.path == '/missing.png':
+                return httpx.Response(404)
+            return httpx.Response(200, content=b'async-img', headers={
+                'Content-Type': 'image/png', 'Cache-Control': 'max-age=600',
+            })
+
+        factory = AsyncRequestFactory()
+        with patch.object(image_proxy_async, 'make_client',
+                          lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            response = await proxy_image_async(factory.get('/proxy-image/', {'url': 'http://img.test/async.png'}))
+            body = b''.join(response.streaming_content)
+            response.close()
+            self.assertEqual(body, b'async-img')
+            self.assertEqual(response['Content-Type'], 'image/png')
+
+            missing = await proxy_image_async(factory.get('/proxy-image/', {'url': 'http://img.test/missing.png'}))
+            self.assertEqual(missing.status_code, 500)
+
+        self.assertEqual(len(calls), 2)
+        sync_response, sync_body = await sync_to_async(self._get)('http://img.test/async.png')
+        self.assertEqual(sync_body, b'async-img')
+        self.assertEqual(sync_response['ETag'], response['ETag'])
+
+    async def test_async_variant_of_no_store_image_is_fetched_once(self):
+        import httpx
+        from io import BytesIO
+        from PIL import Image
+        from django.test import AsyncRequestFactory
+        from main import image_proxy_async
+        from main.views import proxy_image_async
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'red').save(buffer, 'PNG')
+        calls = []
+
+        def handler(request):
+            calls.append(str(request.url))
+            return httpx.Response(200, content=buffer.getvalue(), headers={
+                'Content-Type': 'image/png', 'Cache-Control': 'no-store',
+            })
+
+        factory = AsyncRequestFactory()
+        with patch.object(image_proxy_async, 'make_client',
+                          lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))):
+            response = await proxy_image_async(factory.get('/proxy-image/', {
+                'url': 'http://img.test/live.png', 'w': '100',
+            }))
+        body = b''.join(response.streaming_content)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(Image.open(BytesIO(body)).size, (160, 80))
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(IMAGE_CACHE_MAX_BYTES=10 * 1024 * 1024)
+    @patch('main.image_proxy.fetch_upstream')
+    def test_warm_image_cache_command(self, mock_fetch):
+        from io import BytesIO, StringIO
+        from PIL import Image
+        from django.core.management import call_command
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 500), 'blue').save(buffer, 'PNG')
+        import requests
+
+        def fetch(url, headers):
+            if 'broken' in url:
+                raise requests.ConnectionError('down')
+            return self._upstream(content=buffer.getvalue(), headers={'Cache-Control': 'max-age=600'})
+        mock_fetch.side_effect = fetch
+        Product.objects.create(product_name="Warm", old_price=1, special_price=1, stock=1,
+                               thumbnail='http://img.test/warm.png')
+
+        out = StringIO()
+        call_command('warm_image_cache', '--widths=320,480', '--rate=0', '--url=http://img.test/broken.png', stdout=out)
+        # warm.png dan fallback default: masing-masing asli + 2 varian
+        self.assertIn('0 hits, 6 misses, 1 failures', out.getvalue())
+
+        out = StringIO()
+        call_command('warm_image_cache', '--widths=320,480', '--rate=0', stdout=out)
+        self.assertIn('6 hits, 0 misses, 0 failures', out.getvalue())
+
+        response = self.client.get(self.url, {'url': 'http://img.test/warm.png', 'w': '480', 'fmt': 'webp'})
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(mock_fetch.call_count, 3)
+
+
+class UserContextTests(MainViewsSetup):
+    def _profile_queries(self, url):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in ctx.captured_queries if 'FROM "main_profile"' in q['sql']]
+
+    def test_login_stores_context_in_session(self):
+        from main.user_context import SESSION_KEY
+        self.client.login(username='testseller', password='password123')
+        stored = self.client.session[SESSION_KEY]
+        self.assertEqual((stored['user_id'], stored['role'], stored['is_admin']), (self.seller_user.pk, 'seller', False))
+
+    def test_pages_do_not_query_profile(self):
+        self.client.login(username='testbuyer', password='password123')
+        for url in [reverse('main:show_main'), reverse('main:show_product', args=[self.product1_seller.id]),
+                    reverse('profile_dashboard:profile_json')]:
+            response, queries = self._profile_queries(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(queries, [], url)
+        self.assertEqual(response.json()['role'], 'buyer')
+
+    def test_profile_edit_invalidates_context(self):
+        self.client.login(username='testbuyer', password='password123')
+        self.buyer_profile.address = 'Jl. Baru 1'
+        self.buyer_profile.save()
+
+        response, queries = self._profile_queries(reverse('profile_dashboard:profile_json'))
+        self.assertEqual(response.json()['address'], 'Jl. Baru 1')
+        self.assertEqual(len(queries), 1)
+        # Sesudah dimuat ulang, request berikutnya kembali tanpa query
+        self.assertEqual(self._profile_queries(reverse('profile_dashboard:profile_json'))[1], [])
+
+    @override_settings(PRODUCTION=True)
+    def test_process_local_cache_is_not_trusted_in_production(self):
+        from main.models import Profile
+        from main.user_context import SESSION_KEY
+        self.client.login(username='testbuyer', password='password123')
+        self.assertNotIn(SESSION_KEY, self.client.session)
+        # Edit dari worker lain: tidak ada invalidasi yang sampai ke proses ini
+        Profile.objects.filter(pk=self.buyer_profile.pk).update(address='Jl. Lain 2')
+
+        response, queries = self._profile_queries(reverse('profile_dashboard:profile_json'))
+        self.assertEqual(response.json()['address'], 'Jl. Lain 2')
+        self.assertEqual(len(queries), 1)
+
+    def test_template_uses_session_role(self):
+        self.client.login(username='testbuyer', password='password123')
+        response = self.client.get(reverse('main:show_main'))
+        self.assertContains(response, 'const CURRENT_USER_ROLE = `buyer`')
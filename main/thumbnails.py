@@ -0,0 +1,125 @@
+"""
+Varian thumbnail (resize + kompresi ulang) untuk /proxy-image/?url=...&w=&h=&fmt=.
+
+Lebar/tinggi dibulatkan ke atas ke THUMBNAIL_SIZES supaya jumlah varian per
+gambar terbatas. Varian disimpan di cache disk yang sama dengan key berbasis
+ETag (hash isi) gambar asli, jadi URL berbeda dengan isi sama berbagi varian
+dan gambar asli yang berubah otomatis menghasilkan varian baru.
+
+Pillow bersifat opsional: tanpa Pillow, gambar asli dikirim apa adanya.
+"""
+from io import BytesIO
+from django.conf import settings
+from main.image_cache import cache_key, get_cache
+from main.image_proxy import ImageResult, get_image
+
+try:
+    from PIL import Image, ImageOps
+    RENDER_ERRORS = (OSError, Image.DecompressionBombError)
+except ImportError:  # pragma: no cover - Pillow tidak terpasang
+    Image = None
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'jpg': ('JPEG', 'image/jpeg'),
+}
+DEFAULT_SIZES = (160, 320, 480, 640, 960, 1280)
+
+
+class InvalidVariant(ValueError):
+    pass
+
+
+def _round_up(value, sizes):
+    for size in sizes:
+        if value <= size:
+            return size
+    return sizes[-1]
+
+
+def parse_variant(params):
+    """
+    Baca w, h, fmt dari query string. Mengembalikan None kalau tidak ada
+    parameter varian, atau (w, h, fmt) dengan w/h None kalau tidak dibatasi.
+    """
+    raw_w, raw_h, fmt = params.get('w'), params.get('h'), (params.get('fmt') or '').lower()
+    if not (raw_w or raw_h or fmt):
+        return None
+    sizes = tuple(sorted(getattr(settings, 'THUMBNAIL_SIZES', DEFAULT_SIZES)))
+
+    dims = []
+    for raw in (raw_w, raw_h):
+        if not raw:
+            dims.append(None)
+            continue
+        try:
+            value = int(raw)
+        except ValueError:
+            raise InvalidVariant(f'Invalid size: {raw}')
+        if value <= 0:
+            raise InvalidVariant(f'Invalid size: {raw}')
+        dims.append(_round_up(value, sizes))
+
+    if fmt and fmt not in FORMATS:
+        raise InvalidVariant(f'Unsupported format: {fmt}')
+    return dims[0], dims[1], FORMATS[fmt or 'jpeg'][0].lower()
+
+
+def render_variant(data, width, height, fmt):
+    pil_format, _ = FORMATS[fmt]
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width or image.width, height or image.height), Image.LANCZOS)
+        if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        output = BytesIO()
+        quality = getattr(settings, 'THUMBNAIL_QUALITY', 80)
+        image.save(output, pil_format, quality=quality, optimize=pil_format == 'JPEG')
+    return output.getvalue()
+
+
+def _read_all(image):
+    if image.file is not None:
+        with image.file:
+            return image.file.read()
+    return b''.join(image.chunks)
+
+
+def get_thumbnail(url, width, height, fmt, original=None):
+    """
+    Kembalikan varian thumbnail dari url. original boleh diisi ImageResult
+    gambar asli yang sudah diambil (mis. dari jalur async) supaya tidak di-fetch ulang.
+    """
+    if original is None:
+        original = get_image(url)
+    if Image is None:
+        return original
+
+    if not original.etag:
+        # Upstream no-store: render langsung tanpa menyimpan apa pun
+        data = _read_all(original)
+        try:
+            return ImageResult(FORMATS[fmt][1], '', chunks=iter([render_variant(data, width, height, fmt)]))
+        except RENDER_ERRORS:
+            return ImageResult(original.content_type, '', chunks=iter([data]))
+
+    cache = get_cache()
+    key = cache_key(original.etag, f'{width}x{height}.{fmt}')
+    entry = cache.get(key)
+    if entry is None:
+        with cache.single_flight(key):
+            entry = cache.get(key)
+            if entry is None:
+                data = _read_all(original)
+                try:
+                    rendered = render_variant(data, width, height, fmt)
+                except RENDER_ERRORS:
+                    # Bukan gambar yang bisa dibaca Pillow, kirim aslinya
+                    return ImageResult(original.content_type, original.etag, chunks=iter([data]))
+                # Key berbasis isi, jadi varian tidak pernah basi selama masih ada di cache
+                ttl = getattr(settings, 'THUMBNAIL_CACHE_TTL', 365 * 24 * 60 * 60)
+                entry = cache.set(key, rendered, FORMATS[fmt][1], ttl)
+    if original.file is not None and not original.file.closed:
+        original.file.close()
+    return ImageResult(entry.content_type, entry.etag, file=entry.open())
@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import path, include
 from main.views import (
     delete_product_ajax, edit_product_ajax, show_main, show_product, show_xml, show_json,
-    show_xml_by_id, show_json_by_id, register, login_user,
-    logout_user, add_product_entry_ajax, proxy_image, create_product_flutter
+    show_json_paginated, show_json_batch, show_xml_by_id, show_json_by_id, register, login_user,
+    export_json, export_ndjson, export_xml, show_category_facets, search_products_json, autocomplete_products,
+    logout_user, add_product_entry_ajax, proxy_image, proxy_image_async, create_product_flutter
 )
 
 app_name = 'main'
@@ -12,6 +14,14 @@ urlpatterns = [
     path('product/<str:id>/', show_product, name='show_product'),
     path('xml/', show_xml, name='show_xml'),
     path('json/', show_json, name='show_json'),
+    path('json/page/', show_json_paginated, name='show_json_paginated'),
+    path('json/batch/', show_json_batch, name='show_json_batch'),
+    path('export/json/', export_json, name='export_json'),
+    path('export/ndjson/', export_ndjson, name='export_ndjson'),
+    path('export/xml/', export_xml, name='export_xml'),
+    path('categories/json/', show_category_facets, name='show_category_facets'),
+    path('search/', search_products_json, name='search_products_json'),
+    path('autocomplete/', autocomplete_products, name='autocomplete_products'),
     path('xml/<str:product_id>/', show_xml_by_id, name='show_xml_by_id'),
     path('json/<str:product_id>/', show_json_by_id, name='show_json_by_id'),
     path('register/', register, name='register'),
@@ -20,6 +30,6 @@ urlpatterns = [
     path('delete-product-ajax/<uuid:id>/', delete_product_ajax, name='delete_product_ajax'),
     path('create-product-ajax/', add_product_entry_ajax, name='add_product_entry_ajax'),
     path('edit-product-ajax/<uuid:id>/', edit_product_ajax, name='edit_product_ajax'),
-    path('proxy-image/', proxy_image, name='proxy_image'),
+    path('proxy-image/', proxy_image_async if settings.IMAGE_PROXY_ASYNC else proxy_image, name='proxy_image'),
     path('create-flutter/', create_product_flutter, name='create_product_flutter'),
 ]
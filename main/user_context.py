@@ -0,0 +1,86 @@
+"""
+Data profil user yang dipakai hampir setiap halaman (role, store_name, address,
+is_admin), disimpan di session supaya tidak perlu query main_profile per request.
+
+Diisi saat login (signal user_logged_in) dan dibaca lewat request.user_context
+(UserContextMiddleware) atau {{ user_context }} di template (context processor).
+Setiap user punya version stamp di cache Django yang diganti saat Profile
+disimpan/dihapus, jadi perubahan dari session lain (web vs Flutter) juga
+membuat data di session ini dimuat ulang pada request berikutnya.
+
+Version stamp harus ada di cache yang dipakai bersama semua worker (lihat
+main/shared_cache.py); tanpa itu context dibangun ulang dari database setiap
+request, supaya edit di satu worker tidak tersembunyi dari worker lain.
+"""
+from django.utils.functional import SimpleLazyObject
+from main.models import Profile
+from main.shared_cache import get_shared_cache, new_token, version_token
+
+SESSION_KEY = 'user_context'
+ANONYMOUS = {'role': None, 'store_name': None, 'address': None, 'is_admin': False}
+
+
+def _version_key(user_id):
+    return f'user-context:version:{user_id}'
+
+
+def build(user):
+    """Ambil data context dari database (satu query profile)."""
+    try:
+        profile = Profile.objects.only('role', 'store_name', 'address', 'is_admin').get(user=user)
+    except Profile.DoesNotExist:
+        profile = None
+    return {
+        'role': profile.role if profile else None,
+        'store_name': profile.store_name if profile else None,
+        'address': profile.address if profile else None,
+        'is_admin': bool(user.is_superuser or user.is_staff or (profile and profile.is_admin)),
+    }
+
+
+def remember(request, user):
+    data = build(user)
+    cache = get_shared_cache()
+    if cache is not None:
+        version = version_token(cache, _version_key(user.pk))
+        request.session[SESSION_KEY] = {'user_id': user.pk, 'version': version, **data}
+    return data
+
+
+def get_user_context(request):
+    if not request.user.is_authenticated:
+        return dict(ANONYMOUS)
+    cache = get_shared_cache()
+    if cache is None:
+        return build(request.user)
+    stored = request.session.get(SESSION_KEY)
+    version = version_token(cache, _version_key(request.user.pk))
+    if stored and stored.get('user_id') == request.user.pk and stored.get('version') == version:
+        return {key: stored[key] for key in ANONYMOUS}
+    return remember(request, request.user)
+
+
+def forget(request):
+    request.session.pop(SESSION_KEY, None)
+
+
+def invalidate(user_id):
+    cache = get_shared_cache()
+    if cache is not None:
+        cache.set(_version_key(user_id), new_token(), timeout=None)
+
+
+class UserContextMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Lazy: request yang tidak memakai context (static, JSON produk) tidak menyentuh session/cache
+        request.user_context = SimpleLazyObject(lambda: get_user_context(request))
+        return self.get_response(request)
+
+
+def user_context(request):
+    """Context processor: {{ user_context.role }} dan seterusnya."""
+    context = getattr(request, 'user_context', None)
+    return {'user_context': context if context is not None else SimpleLazyObject(lambda: get_user_context(request))}
@@ -3,12 +3,14 @@ import decimal
 import requests
 import json
 import os
+import uuid
+from asgiref.sync import sync_to_async
 from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.core import serializers
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
@@ -16,7 +18,20 @@ from django.utils.html import strip_tags
 from django.contrib.auth.models import User
 from django.db import transaction
 from main.forms import RegisterForm
-from main.models import Product, ProductsData
+from main.models import Product
+from main.autocomplete import suggest
+from main.exports import stream_json_array, stream_ndjson, stream_xml
+from main.facets import get_facets
+from main.filters import InvalidFilter, filter_products
+from main.image_cache import ImageTooLarge
+from main.image_proxy import build_response as build_image_response, get_image
+from main.image_proxy_async import FETCH_ERRORS as IMAGE_FETCH_ERRORS, HTTPX_AVAILABLE
+from main.image_proxy_async import get_image_async, read_body
+from main.product_cache import get_product, get_product_or_404
+from main.pagination import SORT_FIELDS, InvalidCursor, get_page_size, paginate_keyset
+from main.search import search_products
+from main.serializers import parse_fields, product_rows, row_to_payload, serialize_products
+from main.thumbnails import InvalidVariant, get_thumbnail, parse_variant
 from django.conf import settings
 
 # ========== MAIN DASHBOARD ==========
@@ -39,36 +54,23 @@ def show_main(request):
     if selected_category and selected_category.lower() != "all":
         product_list = product_list.filter(category__iexact=selected_category.strip())
 
-    if 'product_data' in settings.DATABASES:
-        ecommerce_products = ProductsData.objects.using('product_data').all()
-    else:
-        ecommerce_products = []
-    
     if request.user.is_superuser:
         role = 'admin'
     else:
-        profile = getattr(request.user, 'profile', None)
-        if profile and hasattr(profile, 'role') and profile.role:
-            role = profile.role
-        else:
-            role = 'buyer'
+        # Dari session (main.user_context), bukan query profile per request
+        role = request.user_context['role'] or 'buyer'
 
-    internal_categories = list(Product.objects.values_list('category', flat=True).distinct())
-    if 'product_data' in settings.DATABASES:
-        external_products = ProductsData.objects.using('product_data').all()
-    else:
-        external_products = []
-    external_categories = [infer_category(getattr(p, 'product_name', '')) for p in external_products]
-    combined_categories = sorted(set(filter(None, internal_categories + external_categories)))
+    # Facet kategori sudah dihitung inkremental (main.facets), tidak perlu scan produk eksternal
+    category_facets = get_facets()
 
     context = {
         'product_list': product_list,
-        'ecommerce_products': ecommerce_products,
         'last_login': request.COOKIES.get('last_login', "Never"),
         'role': role,
         'is_admin': request.user.is_superuser,
         'is_buyer': role == 'pembeli',
-        'categories': combined_categories,
+        'categories': [facet['category'] for facet in category_facets],
+        'category_facets': category_facets,
         'selected_category': selected_category,
     }
 
@@ -76,12 +78,11 @@ def show_main(request):
 
 @login_required(login_url='/login')
 def show_product(request, id):
-    product = get_object_or_404(Product, pk=id)
+    product = get_product_or_404(id)
     
     is_owner = product.seller == request.user
     
-    profile = getattr(request.user, 'profile', None)
-    user_role = getattr(profile, 'role', None) if profile else None
+    user_role = request.user_context['role']
     
     is_admin_or_superuser = request.user.is_superuser or user_role == 'admin'
     
@@ -232,52 +233,164 @@ def show_xml(request):
     return HttpResponse(xml_data, content_type="application/xml")
 
 def show_json(request):
-    sync_products_data()
-    products = Product.objects.all()
-    product_json = serializers.serialize('json', products)
-    all_products = json.loads(product_json)
-    return JsonResponse(all_products, safe=False)
+    fields = parse_fields(request.GET.get('fields'))
+    try:
+        products = filter_products(Product.objects.all(), request.GET, request.user)
+    except InvalidFilter as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    return JsonResponse(serialize_products(products, fields), safe=False)
+
+def show_json_paginated(request):
+    fields = parse_fields(request.GET.get('fields'))
+    try:
+        products = filter_products(Product.objects.all(), request.GET, request.user)
+        rows, next_cursor = paginate_keyset(
+            product_rows(products, fields, extra=SORT_FIELDS),
+            sort=request.GET.get('sort', 'created_at'),
+            cursor=request.GET.get('cursor'),
+            page_size=get_page_size(request.GET.get('page_size')),
+        )
+    except InvalidFilter as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    except InvalidCursor:
+        return JsonResponse({"status": "error", "message": "Invalid cursor."}, status=400)
+
+    return JsonResponse({
+        "results": [row_to_payload(row, fields) for row in rows],
+        "next": next_cursor,
+    })
+
+def _export_response(stream, content_type, filename):
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def export_json(request):
+    fields = parse_fields(request.GET.get('fields'))
+    return _export_response(stream_json_array(Product.objects.order_by('created_at', 'id'), fields),
+                            'application/json', 'products.json')
+
+def export_ndjson(request):
+    fields = parse_fields(request.GET.get('fields'))
+    return _export_response(stream_ndjson(Product.objects.order_by('created_at', 'id'), fields),
+                            'application/x-ndjson', 'products.ndjson')
+
+def export_xml(request):
+    return _export_response(stream_xml(Product.objects.order_by('created_at', 'id')),
+                            'application/xml', 'products.xml')
+
+def show_category_facets(request):
+    return JsonResponse({"categories": get_facets()})
+
+def search_products_json(request):
+    query = request.GET.get('q', '').strip()
+    fields = parse_fields(request.GET.get('fields'))
+    page_size = get_page_size(request.GET.get('page_size'))
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    # Offset raksasa (page=10**20) tidak muat di INTEGER database; halaman sejauh itu pasti kosong
+    if page > getattr(settings, 'PRODUCT_SEARCH_MAX_PAGE', 1000):
+        hits = []
+    else:
+        hits = search_products(query, page_size + 1, (page - 1) * page_size)
+    has_next = len(hits) > page_size
+    hits = hits[:page_size]
+
+    ids = [uuid.UUID(str(pk)) for pk, _ in hits]
+    rows = {row['id']: row for row in product_rows(Product.objects.filter(id__in=ids), fields)}
+    results = []
+    for pk, (_, rank) in zip(ids, hits):
+        if pk in rows:
+            payload = row_to_payload(rows[pk], fields)
+            payload["rank"] = rank
+            results.append(payload)
+
+    return JsonResponse({
+        "query": query,
+        "page": page,
+        "has_next": has_next,
+        "results": results,
+    })
+
+def autocomplete_products(request):
+    try:
+        limit = min(max(1, int(request.GET.get('limit', 8))), 20)
+    except ValueError:
+        limit = 8
+    query = request.GET.get('q', '')
+    return JsonResponse({"query": query, "suggestions": suggest(query, limit)})
 
 def show_xml_by_id(request, product_id):
     product = Product.objects.filter(pk=product_id)
     xml_data = serializers.serialize("xml", product)
     return HttpResponse(xml_data, content_type="application/xml")
 
+def product_detail_payload(product):
+    """Bentuk satu produk untuk /json/<id>/ dan /json/batch/ (butuh seller__profile sudah dimuat)."""
+    seller_display = "N/A"
+    if product.seller:
+        profile = getattr(product.seller, 'profile', None)
+        if profile and profile.store_name:
+            seller_display = profile.store_name
+        else:
+            seller_display = product.seller.username
+    return {
+        "pk": str(product.id),
+        "model": "main.product",
+        "fields": {
+            "product_name": product.product_name,
+            "description": product.description,
+            "category": product.category,
+            "old_price": float(product.old_price),
+            "special_price": float(product.special_price),
+            "discount_percent": product.discount_percent,
+            "thumbnail": product.thumbnail,
+            "stock": product.stock,
+            "created_at": product.created_at.isoformat(),
+            "seller": product.seller.id if product.seller else None,
+            "seller_username": product.seller.username if product.seller else "N/A",
+            "seller_display": seller_display
+        }
+    }
+
 def show_json_by_id(request, product_id):
     try:
-        product = Product.objects.select_related('seller__profile').get(pk=product_id)
-        
-        seller_display = "N/A"
-        if product.seller:
-            profile = getattr(product.seller, 'profile', None)
-            if profile and profile.store_name:
-                seller_display = profile.store_name
-            else:
-                seller_display = product.seller.username
-        product_data = {
-            "pk": str(product.id),
-            "model": "main.product",
-            "fields": {
-                "product_name": product.product_name,
-                "description": product.description,
-                "category": product.category,
-                "old_price": float(product.old_price),
-                "special_price": float(product.special_price),
-                "discount_percent": product.discount_percent,
-                "thumbnail": product.thumbnail,
-                "stock": product.stock,
-                "created_at": product.created_at.isoformat(),
-                "seller": product.seller.id if product.seller else None,
-                "seller_username": product.seller.username if product.seller else "N/A",
-                "seller_display": seller_display
-            }
-        }
-        
-        return JsonResponse([product_data], safe=False) 
+        product = get_product(product_id)
+        return JsonResponse([product_detail_payload(product)], safe=False) 
     
     except Product.DoesNotExist:
         return JsonResponse([], safe=False)
 
+@csrf_exempt
+def show_json_batch(request):
+    """
+    Beberapa produk sekaligus dalam satu query IN, bentuk per produk sama dengan /json/<id>/.
+    GET ?ids=a,b,c atau POST {"ids": [...]}; urutan mengikuti permintaan, id yang tidak ada dilewati.
+    """
+    if request.method == 'POST':
+        try:
+            raw_ids = json.loads(request.body or b'{}').get('ids', [])
+        except (ValueError, AttributeError):
+            return JsonResponse({"error": "Invalid JSON body"}, status=400)
+        if not isinstance(raw_ids, list):
+            return JsonResponse({"error": "ids must be a list"}, status=400)
+    else:
+        raw_ids = [value for value in request.GET.get('ids', '').split(',') if value.strip()]
+
+    limit = getattr(settings, 'PRODUCT_BATCH_MAX', 100)
+    if len(raw_ids) > limit:
+        return JsonResponse({"error": f"At most {limit} ids per request"}, status=400)
+    try:
+        ids = list(dict.fromkeys(uuid.UUID(str(value).strip()) for value in raw_ids))
+    except ValueError:
+        return JsonResponse({"error": "Invalid product id"}, status=400)
+
+    products = Product.objects.select_related('seller__profile').in_bulk(ids)
+    return JsonResponse([product_detail_payload(products[pk]) for pk in ids if pk in products], safe=False)
+
 # ========== AJAX CRUD FUNCTIONALITY ==========
 @csrf_exempt
 @require_POST
@@ -383,57 +496,53 @@ def delete_product_ajax(request, id):
         }, status=500)
 
 # ========== HELPER FUNCTIONS ==========
-def sync_products_data():
-    if 'product_data' in settings.DATABASES:
-        external_products = ProductsData.objects.using('product_data').all()
-    else:
-        external_products = []
-
-    for ext in external_products:
-        if not Product.objects.filter(product_name=ext.product_name).exists():
-            Product.objects.create(
-                seller=None,
-                product_name=ext.product_name or "Unnamed Product",
-                old_price=ext.old_price or 0,
-                special_price=ext.special_price or 0,
-                discount_percent=int(ext.discount_field or 0),
-                category=infer_category(ext.product_name),
-                description="No description for this product",
-                thumbnail="",
-                stock=10
-            )
-            
-def infer_category(name: str):
-            name = (name or "").lower()
-            if any(x in name for x in ["badminton", "racket", "racquet"]):
-                return "Badminton"
-            elif "volley" in name:
-                return "Volleyball"
-            elif any(x in name for x in ["cricket", "bat", "ball", "wicket"]):
-                return "Cricket"
-            elif "squash" in name:
-                return "Squash"
-            else:
-                return "Accessory"
-
 def proxy_image(request):
     image_url = request.GET.get('url')
     if not image_url:
         return HttpResponse('No URL provided', status=400)
     
     try:
-        # Fetch image from external source
-        response = requests.get(image_url, timeout=10)
-        response.raise_for_status()
-        
-        # Return the image with proper content type
-        return HttpResponse(
-            response.content,
-            content_type=response.headers.get('Content-Type', 'image/jpeg')
-        )
+        # Fetch image (or a resized variant) from disk cache or external source
+        variant = parse_variant(request.GET)
+        if variant:
+            image = get_thumbnail(image_url, *variant)
+        else:
+            image = get_image(image_url)
+    except InvalidVariant as e:
+        return HttpResponse(str(e), status=400)
+    except ImageTooLarge as e:
+        return HttpResponse(str(e), status=502)
     except requests.RequestException as e:
         return HttpResponse(f'Error fetching image: {str(e)}', status=500)
 
+    return build_image_response(request, image)
+
+
+async def proxy_image_async(request):
+    """proxy_image untuk ASGI: fetch upstream lewat httpx tanpa memblokir worker."""
+    if not HTTPX_AVAILABLE:
+        return await sync_to_async(proxy_image, thread_sensitive=False)(request)
+
+    image_url = request.GET.get('url')
+    if not image_url:
+        return HttpResponse('No URL provided', status=400)
+
+    try:
+        variant = parse_variant(request.GET)
+        image = await get_image_async(image_url)
+        if variant:
+            # Resize (CPU-bound) dijalankan di thread dari gambar yang sudah diambil, tanpa fetch ulang
+            image = await read_body(image)
+            image = await sync_to_async(get_thumbnail, thread_sensitive=False)(image_url, *variant, original=image)
+    except InvalidVariant as e:
+        return HttpResponse(str(e), status=400)
+    except ImageTooLarge as e:
+        return HttpResponse(str(e), status=502)
+    except (requests.RequestException, *IMAGE_FETCH_ERRORS) as e:
+        return HttpResponse(f'Error fetching image: {str(e)}', status=500)
+
+    return build_image_response(request, image)
+
 
 @csrf_exempt
 def create_product_flutter(request):
@@ -15,14 +15,11 @@ def profile_dashboard(request):
     user = request.user
     masked_password = '••••••••'
 
-    try:
-        user_role = user.profile.role
-        store_name = user.profile.store_name or '-'
-        address = user.profile.address or '-'
-    except Profile.DoesNotExist:
-        user_role = 'N/A'
-        store_name = '-'
-        address = '-'
+    # Dari session (main.user_context), tanpa query profile
+    context_data = request.user_context
+    user_role = context_data['role'] or 'N/A'
+    store_name = context_data['store_name'] or '-'
+    address = context_data['address'] or '-'
 
     context = {
         'username': user.username,
@@ -134,21 +131,14 @@ def profile_json(request):
             "store_name": "-",
         })
 
-    try:
-        profile = user.profile
-        return JsonResponse({
-            "username": user.username,
-            "role": profile.role,
-            "address": profile.address or "-",
-            "store_name": profile.store_name or "-",
-        })
-    except Profile.DoesNotExist:
-        return JsonResponse({
-            "username": user.username,
-            "role": "buyer",
-            "address": "-",
-            "store_name": "-",
-        })
+    # Dari session (main.user_context); user tanpa profile dianggap buyer
+    context_data = request.user_context
+    return JsonResponse({
+        "username": user.username,
+        "role": context_data['role'] or "buyer",
+        "address": context_data['address'] or "-",
+        "store_name": context_data['store_name'] or "-",
+    })
 
     
 @csrf_exempt
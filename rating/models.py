@@ -20,4 +20,4 @@ class ProductReview(models.Model):
     def update_avg_rating(product):
         avg = ProductReview.objects.filter(product=product).aggregate(avg=Avg('rating'))['avg'] or 0.0
         product.avg_rating = round(avg, 1)
-        product.save()
\ No newline at end of file
+        product.save(update_fields=['avg_rating'])
\ No newline at end of file
@@ -1,4 +1,5 @@
 from django.shortcuts import render, get_object_or_404
+from main.product_cache import get_product_or_404
 from .models import ProductReview
 from rating.forms import ProductReviewForm
 from main.models import Product
@@ -76,7 +77,7 @@ def delete_review_ajax(request, id):
     return HttpResponse(b"DELETED", status=200)
 
 def show_rating_review_ajax(request, id):
-    product = get_object_or_404(Product, id=id)
+    product = get_product_or_404(id)
     sort_order = request.GET.get('sort', 'desc')
 
     reviews = ProductReview.objects.filter(product=product)
@@ -99,7 +100,7 @@ def show_rating_review_ajax(request, id):
     return JsonResponse({"product": product.product_name, "reviews": data})
 
 def helper_function(request, id):
-    product = get_object_or_404(Product,id=id)
+    product = get_product_or_404(id)
     try:
         review = ProductReview.objects.get(product=product, user=request.user)
         return JsonResponse({
@@ -111,7 +112,7 @@ def helper_function(request, id):
         return JsonResponse({'has_review': False})
 
 def show_json(request, id):
-    product = get_object_or_404(Product, id=id)
+    product = get_product_or_404(id)
     reviews = ProductReview.objects.filter(product = product)
     current_user = request.user
     data = [